@@ -1,27 +1,42 @@
 import google.generativeai as genai
-import fitz # For PDF
-import pptx # For PPTX
 from PIL import Image # For Images
-import docx # For DOCX
-import openpyxl # For XLSX
-import pandas as pd # For CSV and better XLSX handling
-from striprtf.striprtf import rtf_to_text # For RTF
 
 import speech_recognition as sr # For Voice Input
 import os # For temporary file management (less critical now, but still good to have)
+import threading
+from functools import partial
 
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QTextEdit, QPushButton,
                              QLabel, QMessageBox, QFileDialog, QHBoxLayout, QInputDialog, 
                              QApplication, QLineEdit, QSizePolicy, QStackedLayout)
-from PyQt5.QtGui import QFont, QPixmap, QImage # Added QImage for Pillow conversion
+from PyQt5.QtGui import QFont, QPixmap, QImage, QTextCursor # Added QImage for Pillow conversion
 from PyQt5.QtCore import Qt, QTimer, QBuffer, QIODevice # Added QBuffer, QIODevice for Pillow conversion
 
 from ui_styles import AppStyles
+from document_extractor import extract_document, get_file_name, ExtractionError
+from extraction_worker import start_extraction
+from speculative_summary import SpeculativeSummarizer
+from near_duplicate import DuplicateIndex, check_document_near_duplicate
 from voice_recognizer import VoiceRecognizer
+from job_queue import JobQueue, JobWorkerPool, run_summary_job, STATUS_QUEUED, STATUS_RUNNING
+from jobs_dialog import JobsDialog
+from folder_watcher import FolderWatcher
+from stream_reader import StreamedTextFile
+from summary_pipeline import (summarize_text, summarize_image, summarize_stream, is_large_text_file, encode_image,
+                              update_summary, plan_stream_summary, STREAM_FULL_LIMIT_BYTES, LARGE_FILE_SAMPLING_MODE)
+from token_budget import (MeteredModel, estimate_tokens, plan_text_summary, start_of_today, IMAGE_TOKENS, MAX_OUTPUT_TOKENS,
+                          DAILY_TOKEN_QUOTA, QUOTA_WARNING_RATIO)
+from db_manager import record_token_usage, get_token_usage
+from gemini_backend import create_model as create_gemini_model
+from key_scheduler import KeyScheduler, KeysExhaustedError, ScheduledModel, parse_api_keys
+from memory_budget import memory_report, EDITOR_CHAR_BUDGET, MEMORY_BUDGET_MB, PREVIEW_CHARS
 
 # Constants for better readability and maintainability
-MAX_INPUT_LENGTH = 1000000
-MAX_OUTPUT_TOKENS = 8192
+MODEL_NAME = "gemini-1.5-flash"
+DISPLAY_IMAGE_SIDE = 600 # Uploaded images are shown as a thumbnail no larger than this
+SPECULATIVE_POLL_SECONDS = 0.1 # How often the GUI checks on a background summary it is waiting for
+JOB_WORKER_COUNT = 2 # Background threads working the summary job queue
+JOBS_STATUS_INTERVAL_MS = 3000
 
 class AINoteSummarizer(QWidget):
     def __init__(self, stacked_widget): # Added stacked_widget parameter
@@ -31,9 +46,30 @@ class AINoteSummarizer(QWidget):
         self.setGeometry(90, 90, 900, 750)
 
         self.is_dark_theme = False # Will be set by LoginPage
-        self.api_key = None
+        self.api_key = None # First configured key; kept for genai.configure() and "is a key set" checks
+        self.key_scheduler = None # Spreads requests over the keys when more than one is configured
         self.voice_recognizer = VoiceRecognizer()
-        self.current_image = None # Stores PIL Image object for summarization
+        self.current_image = None # Encoded image blob for summarization (see encode_image)
+        self.current_document = None # StructuredDocument of the last extracted file
+        self.current_signature = None # MinHash signature of current_document, once computed
+        self.duplicate_update = None # (previous match, diff) when the user asked for a diff-only update
+        self.current_stream_path = None # Large TXT/RTF file summarized straight from disk
+        self.memory_warned_stages = set() # Stages already reported as over MEMORY_BUDGET_MB
+        self.current_file_path = None # Last uploaded file, used when queueing a summary
+        self.username = None # Set by LoginPage after a successful login
+        self.extraction_thread = None # Background document extraction, if one is running
+        self.extraction_worker = None
+        # Opt-in: extracted documents are summarized in the background so the Summarize click hits a cache
+        self.speculative = SpeculativeSummarizer(self.create_model, on_usage=self._record_speculative_usage)
+
+        # Earlier summaries, indexed so new versions of a document can reuse them
+        self.duplicate_index = DuplicateIndex()
+
+        # Background summary jobs persist in SQLite; pick up anything a previous session left running
+        self.job_queue = JobQueue()
+        self.job_queue.recover_interrupted()
+        self.job_workers = None
+        self.folder_watcher = None # Queues summaries for files dropped into a watched folder
 
         try:
             genai.configure(api_key="")
@@ -102,6 +138,7 @@ class AINoteSummarizer(QWidget):
         self.note_input.setMinimumHeight(180)
         self.note_input.setFont(QFont("Segoe UI", 11))
         self.note_input.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.note_input.textChanged.connect(self.speculative.invalidate) # Edits or a new file make background work stale
         content_v_layout.addWidget(self.note_input)
 
         # --- Middle Buttons Layout: Voice Input, Upload, Summarize
@@ -122,6 +159,15 @@ class AINoteSummarizer(QWidget):
         self.upload_button.setSizePolicy(QSizePolicy.MinimumExpanding, QSizePolicy.Preferred)
         middle_buttons_layout.addWidget(self.upload_button)
 
+        # Only shown while a document is being extracted in the background
+        self.cancel_extraction_button = QPushButton("⛔ Cancel", self)
+        self.cancel_extraction_button.setMinimumHeight(45)
+        self.cancel_extraction_button.setFont(QFont("Segoe UI", 12, QFont.Bold))
+        self.cancel_extraction_button.clicked.connect(self.cancel_extraction)
+        self.cancel_extraction_button.setSizePolicy(QSizePolicy.MinimumExpanding, QSizePolicy.Preferred)
+        self.cancel_extraction_button.hide()
+        middle_buttons_layout.addWidget(self.cancel_extraction_button)
+
         self.summarize_button = QPushButton("✨ Summarize ", self)
         self.summarize_button.setMinimumHeight(55)
         self.summarize_button.setFont(QFont("Segoe UI", 14, QFont.Bold))
@@ -168,6 +214,49 @@ class AINoteSummarizer(QWidget):
 
         content_v_layout.addLayout(bottom_action_buttons_layout)
 
+        # --- Background Jobs Layout: Queue Summary and Jobs list
+        jobs_buttons_layout = QHBoxLayout()
+        jobs_buttons_layout.setSpacing(15)
+
+        self.queue_button = QPushButton("📥 Queue Summary", self)
+        self.queue_button.setMinimumHeight(45)
+        self.queue_button.setFont(QFont("Segoe UI", 12, QFont.Bold))
+        self.queue_button.clicked.connect(self.queue_summary)
+        self.queue_button.setSizePolicy(QSizePolicy.MinimumExpanding, QSizePolicy.Preferred)
+        jobs_buttons_layout.addWidget(self.queue_button)
+
+        self.jobs_button = QPushButton("🗂️ Jobs", self)
+        self.jobs_button.setMinimumHeight(45)
+        self.jobs_button.setFont(QFont("Segoe UI", 12, QFont.Bold))
+        self.jobs_button.clicked.connect(self.show_jobs_dialog)
+        self.jobs_button.setSizePolicy(QSizePolicy.MinimumExpanding, QSizePolicy.Preferred)
+        jobs_buttons_layout.addWidget(self.jobs_button)
+
+        self.watch_button = QPushButton("👁️ Watch Folder", self)
+        self.watch_button.setMinimumHeight(45)
+        self.watch_button.setFont(QFont("Segoe UI", 12, QFont.Bold))
+        self.watch_button.setToolTip("Queue a summary for every new or changed file in a folder.")
+        self.watch_button.clicked.connect(self.toggle_folder_watch)
+        self.watch_button.setSizePolicy(QSizePolicy.MinimumExpanding, QSizePolicy.Preferred)
+        jobs_buttons_layout.addWidget(self.watch_button)
+
+        self.speculative_button = QPushButton("⚡ Pre-summarize: Off", self)
+        self.speculative_button.setCheckable(True)
+        self.speculative_button.setMinimumHeight(45)
+        self.speculative_button.setFont(QFont("Segoe UI", 12, QFont.Bold))
+        self.speculative_button.setToolTip("Start summarizing each document in the background as soon as it is loaded.\n"
+                                           "Uses tokens even if you never click Summarize.")
+        self.speculative_button.toggled.connect(self.toggle_speculative)
+        self.speculative_button.setSizePolicy(QSizePolicy.MinimumExpanding, QSizePolicy.Preferred)
+        jobs_buttons_layout.addWidget(self.speculative_button)
+
+        content_v_layout.addLayout(jobs_buttons_layout)
+
+        # Poll the job database so the Jobs button shows how much work is pending
+        self.jobs_status_timer = QTimer(self)
+        self.jobs_status_timer.timeout.connect(self.update_jobs_button)
+        self.jobs_status_timer.start(JOBS_STATUS_INTERVAL_MS)
+
         # --- Wrap content_v_layout in a QWidget to add to QStackedLayout ---
         content_widget = QWidget()
         content_widget.setLayout(content_v_layout)
@@ -217,6 +306,10 @@ class AINoteSummarizer(QWidget):
         self.voice_input_button.setStyleSheet(AppStyles.get_secondary_button_style(self.is_dark_theme))
         self.api_settings_button.setStyleSheet(AppStyles.get_secondary_button_style(self.is_dark_theme))
         self.export_button.setStyleSheet(AppStyles.get_secondary_button_style(self.is_dark_theme))
+        self.queue_button.setStyleSheet(AppStyles.get_secondary_button_style(self.is_dark_theme))
+        self.jobs_button.setStyleSheet(AppStyles.get_secondary_button_style(self.is_dark_theme))
+        self.speculative_button.setStyleSheet(AppStyles.get_secondary_button_style(self.is_dark_theme))
+        self.watch_button.setStyleSheet(AppStyles.get_secondary_button_style(self.is_dark_theme))
         self.theme_toggle_button.setStyleSheet(AppStyles.get_toggle_button_style(self.is_dark_theme))
         self.logout_button.setStyleSheet(AppStyles.get_secondary_button_style(self.is_dark_theme))
 
@@ -230,23 +323,43 @@ class AINoteSummarizer(QWidget):
         self.apply_theme_styles()
 
     def show_api_key_dialog(self):
-        current_api_key = self.api_key or ""
-        key, ok = QInputDialog.getText(self, 'API Key Settings', 'Enter your Gemini API key:', QLineEdit.Normal, current_api_key)
-        if ok and key:
-            self.api_key = key
+        current_api_key = ", ".join(self.key_scheduler.keys) if self.key_scheduler else (self.api_key or "")
+        text, ok = QInputDialog.getText(self, 'API Key Settings',
+                                        'Enter your Gemini API key\n(separate several keys with commas to spread the load):',
+                                        QLineEdit.Normal, current_api_key)
+        keys = parse_api_keys(text) if ok else []
+        if ok and keys:
+            self.api_key = keys[0]
+            previous_scheduler = self.key_scheduler
             try:
                 genai.configure(api_key=self.api_key)
-                QMessageBox.information(self, "Success", "API key updated successfully!")
+                self.key_scheduler = KeyScheduler(keys) if len(keys) > 1 else None
+                self.stop_job_workers() # Restart so the worker count matches the number of keys
+                if previous_scheduler:
+                    previous_scheduler.close() # Its per-key connections are no longer used
+                self.start_job_workers()
+                if len(keys) > 1:
+                    QMessageBox.information(self, "Success", f"{len(keys)} API keys configured. Requests will be spread across them.")
+                else:
+                    QMessageBox.information(self, "Success", "API key updated successfully!")
             except Exception as e:
                 self.api_key = None
+                self.key_scheduler = None
                 QMessageBox.warning(self, "Error", f"Invalid API key format. Please ensure it's correct.\nError: {str(e)}")
-        elif ok and not key:
+        elif ok and not keys:
             self.api_key = None
+            self.key_scheduler = None
             QMessageBox.warning(self, "API Key Warning", "API key cannot be empty. Summarization might fail.")
 
     def clear_all_inputs(self):
+        self.cancel_extraction()
         self.note_input.clear()
         self.current_image = None
+        self.current_document = None
+        self.current_signature = None
+        self.duplicate_update = None
+        self.current_stream_path = None
+        self.current_file_path = None
         self.summary_output.clear()
         self.note_input.setPlaceholderText("Type or paste your notes here, or upload a document...")
         self.image_display_label.clear() # Clear the image from the label
@@ -281,6 +394,11 @@ class AINoteSummarizer(QWidget):
         
         if file_path:
             self.current_image = None # Clear any previously loaded image for Gemini
+            self.current_document = None
+            self.current_signature = None
+            self.duplicate_update = None
+            self.current_stream_path = None
+            self.current_file_path = file_path
             self.note_input.clear() # Clear note input when a new file is loaded
             self.image_display_label.clear() # Clear previous image from display
             self.image_display_label.hide() # Hide image display by default
@@ -291,85 +409,201 @@ class AINoteSummarizer(QWidget):
 
             if file_extension in ["png", "jpg", "jpeg"]:
                 try:
-                    self.current_image = Image.open(file_path) # Load image with Pillow for Gemini
-                    qpixmap = self.convert_pil_to_qpixmap(self.current_image) # Convert for display
+                    with memory_report.track("load image"), Image.open(file_path) as image:
+                        # Keep only the encoded bytes for Gemini and a label-sized thumbnail for display;
+                        # the full decoded image is released when the with block closes it
+                        self.current_image = encode_image(image)
+                        thumbnail = image.copy()
+                        thumbnail.thumbnail((DISPLAY_IMAGE_SIDE, DISPLAY_IMAGE_SIDE))
+                    qpixmap = self.convert_pil_to_qpixmap(thumbnail) # Convert for display
                     self.image_display_label.setPixmap(qpixmap) # Set image on the label
                     self.image_display_label.show() # Show the label
 
                     self.note_input.setPlainText(f"Image loaded: {file_path.split('/')[-1]}\n\n"
                                                  "Click 'Summarize' to get a visual summary.")
                     self.summary_output.setPlainText("Image loaded. Ready to summarize visual content.")
+                    self._print_memory_report()
                 except Exception as e:
                     QMessageBox.warning(self, "Image Load Error", f"Could not load image: {str(e)}")
                     self.current_image = None
                     self.image_display_label.clear()
                     self.image_display_label.hide()
                     self.summary_output.setPlainText("Failed to load image.")
+            elif is_large_text_file(file_path):
+                self.load_large_text_file(file_path)
             else:
-                extracted_text = self.extract_text_from_file(file_path)
-                self.note_input.setPlainText(extracted_text)
-                self.summary_output.setPlainText("Text extraction complete. You can now summarize.")
+                self.start_document_extraction(file_path)
+
+    def start_document_extraction(self, file_path):
+        """Extracts a document on a worker thread; text streams into the editor as it is found."""
+        after_extract = None
+        if self.username:
+            # The near-duplicate lookup (MinHash and diff) runs on the extraction thread as well
+            after_extract = partial(check_document_near_duplicate, self.duplicate_index, self.username)
+        self.extraction_thread, self.extraction_worker = start_extraction(file_path, self, after_extract)
+        self.extraction_worker.progress.connect(self._show_extraction_progress)
+        self.extraction_worker.text_ready.connect(self._append_extracted_text)
+        self.extraction_worker.finished.connect(self._extraction_finished)
+        self.extraction_worker.failed.connect(self._extraction_failed)
+        self._set_extracting(True)
+        self.summary_output.setPlainText(f"Extracting {get_file_name(file_path)}...")
+        self.extraction_thread.start()
+
+    def cancel_extraction(self):
+        """Stops a running extraction at its next page, slide, paragraph or row chunk."""
+        if self.extraction_worker is None:
+            return
+        self.extraction_worker.cancel()
+        self.extraction_worker = None # Signals still queued from the old worker are ignored
+        self.extraction_thread = None
+        self.current_file_path = None
+        self._set_extracting(False)
+        self.note_input.clear()
+        self.summary_output.setPlainText("Extraction cancelled.")
 
-    def extract_text_from_file(self, file_path):
-        try:
-            file_extension = file_path.lower().split('.')[-1]
-            text = ""
+    def _set_extracting(self, busy):
+        self.upload_button.setEnabled(not busy)
+        self.summarize_button.setEnabled(not busy)
+        self.queue_button.setEnabled(not busy)
+        self.note_input.setReadOnly(busy) # Streamed text is replaced by the full document when extraction ends
+        self.cancel_extraction_button.setVisible(busy)
 
-            if file_extension == "pdf":
-                try:
-                    doc = fitz.open(file_path)
-                    text = "\n".join([page.get_text("text") for page in doc])
-                    doc.close()
-                except ImportError:
-                    QMessageBox.critical(self, "Missing Dependency",
-                                         "PyMuPDF (fitz) is not installed. Please install it using: pip install PyMuPDF")
-                    return ""
-                except Exception as pdf_e:
-                    QMessageBox.warning(self, "PDF Read Error",
-                                         f"Could not read PDF file. It might be corrupted or encrypted: {pdf_e}")
-                    return ""
-            elif file_extension == "pptx":
-                prs = pptx.Presentation(file_path)
-                for slide in prs.slides:
-                    for shape in slide.shapes:
-                        if hasattr(shape, 'text'):
-                            text += shape.text + "\n"
-            elif file_extension == "txt":
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    text = f.read()
-            elif file_extension == "docx":
-                doc = docx.Document(file_path)
-                for para in doc.paragraphs:
-                    text += para.text + "\n"
-            elif file_extension == "rtf":
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    rtf_content = f.read()
-                try:
-                    text = rtf_to_text(rtf_content)
-                except Exception as rtf_e:
-                    QMessageBox.warning(self, "RTF Error", f"Could not parse RTF content. May contain unsupported elements.\nError: {rtf_e}")
-                    text = rtf_content # Fallback to raw RTF if parsing fails
-            elif file_extension == "xlsx":
-                workbook = openpyxl.load_workbook(file_path)
-                for sheet_name in workbook.sheetnames:
-                    sheet = workbook[sheet_name]
-                    text += f"\n--- Sheet: {sheet_name} ---\n"
-                    for row in sheet.iter_rows():
-                        for cell in row:
-                            if cell.value is not None:
-                                text += str(cell.value) + " "
-                        text += "\n"
-            elif file_extension == "csv":
-                df = pd.read_csv(file_path)
-                text = df.to_string(index=False)
-            else:
-                QMessageBox.warning(self, "Unsupported File Type", f"File type '.{file_extension}' is not supported for text extraction.")
-                return ""
+    def _is_current_extraction(self):
+        return self.extraction_worker is not None and self.sender() is self.extraction_worker
 
-            return text.strip()
+    def _show_extraction_progress(self, done, total, location):
+        if not self._is_current_extraction():
+            return
+        file_name = get_file_name(self.extraction_worker.file_path)
+        if total:
+            self.summary_output.setPlainText(f"Extracting {file_name}: {location} of {total} ({done * 100 // total}%)...")
+        else:
+            self.summary_output.setPlainText(f"Extracting {file_name}: {location}...")
+
+    def _append_extracted_text(self, text):
+        if not self._is_current_extraction():
+            return
+        cursor = self.note_input.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+
+    def _extraction_finished(self, document, duplicate):
+        if not self._is_current_extraction():
+            return
+        self.extraction_worker = None
+        self.extraction_thread = None
+        self._set_extracting(False)
+        self.current_document = document
+        for title, message in document.warnings:
+            QMessageBox.warning(self, title, message)
+        with memory_report.track("display"):
+            self.show_document(document)
+        self._print_memory_report()
+        if not self.offer_near_duplicate(duplicate):
+            self.start_speculative_summary()
+
+    def offer_near_duplicate(self, duplicate):
+        """
+        duplicate is the (signature, match, changes) lookup the extraction worker ran against this
+        user's earlier summaries. When it found a near-duplicate, offers its summary or a diff-only
+        update. Returns True if the user took either.
+        """
+        if duplicate is None:
+            return False
+        self.current_signature, match, changes = duplicate
+        if match is None:
+            return False
+
+        box = QMessageBox(self)
+        box.setIcon(QMessageBox.Question)
+        box.setWindowTitle("Similar Document Found")
+        box.setText(f"This looks like a version of '{match['title']}' (about {match['similarity']:.0%} similar), "
+                    "which you have summarized before.")
+        box.setInformativeText("Reuse that summary, update it from the changes only, or summarize from scratch?")
+        reuse_button = box.addButton("Use Previous Summary", QMessageBox.AcceptRole)
+        update_button = box.addButton("Update From Changes", QMessageBox.ActionRole) if changes else None
+        box.addButton("Summarize From Scratch", QMessageBox.RejectRole)
+        box.exec_()
+
+        if box.clickedButton() is reuse_button:
+            self.summary_output.setPlainText(match["summary"])
+            self.summary_output.verticalScrollBar().setValue(0)
+            return True
+        if update_button is not None and box.clickedButton() is update_button:
+            self.duplicate_update = (match, changes)
+            self.summarize_content()
+            return True
+        return False
+
+    def remember_summary(self, summary):
+        """Indexes the summary of an unedited extracted document for later near-duplicate uploads."""
+        if not (self.username and self.current_document) or self.note_input.document().isModified():
+            return
+        title = get_file_name(self.current_file_path) if self.current_file_path else "Untitled"
+        self.duplicate_index.add(self.username, title, self.current_document.text, summary, self.current_signature)
+
+    def _extraction_failed(self, title, message):
+        if not self._is_current_extraction():
+            return
+        self.extraction_worker = None
+        self.extraction_thread = None
+        self._set_extracting(False)
+        self.note_input.clear()
+        QMessageBox.warning(self, title, message)
+        self.summary_output.setPlainText("Failed to extract text.")
+
+    def show_document(self, document):
+        """
+        Puts an extracted document in the editor. Documents over EDITOR_CHAR_BUDGET only get a
+        preview there; until the editor is edited, summaries read the document's own buffer.
+        """
+        if len(document) > EDITOR_CHAR_BUDGET:
+            self.note_input.setPlainText(document.text[:PREVIEW_CHARS])
+            self.summary_output.setPlainText(f"Large document ({len(document):,} characters). Showing the first "
+                                             f"{PREVIEW_CHARS:,}; the whole document will be summarized. You can now summarize.")
+        else:
+            self.note_input.setPlainText(document.text)
+            self.summary_output.setPlainText("Text extraction complete. You can now summarize.")
+        self.note_input.document().setModified(False) # Editing switches summaries back to the editor text
+
+    def current_note_text(self):
+        """
+        The text to summarize: the extracted document's shared buffer while the editor is
+        unedited (no QTextEdit copy), otherwise the editor contents.
+        """
+        if self.current_document and not self.note_input.document().isModified():
+            return self.current_document.text
+        return self.note_input.toPlainText().strip()
+
+    def _print_memory_report(self):
+        """Prints the memory report when enabled, and warns once per stage that went over the budget."""
+        if not memory_report.enabled:
+            return
+        print(memory_report.report())
+        over = [stage for stage in memory_report.over_budget() if stage not in self.memory_warned_stages]
+        if over:
+            self.memory_warned_stages.update(over)
+            self.summary_output.append(f"Memory use went over the {MEMORY_BUDGET_MB} MB budget ({', '.join(over)}). "
+                                       "From now on TXT/RTF files are streamed from disk.")
+
+    def extract_text_from_file(self, file_path):
+        document = self.extract_document_from_file(file_path)
+        return document.text if document else ""
+
+    def extract_document_from_file(self, file_path):
+        """Extracts a file into a StructuredDocument, reporting problems in dialogs. Returns None on failure."""
+        try:
+            document = extract_document(file_path)
+        except ExtractionError as e:
+            QMessageBox.warning(self, e.title, e.message)
+            return None
         except Exception as e:
-            QMessageBox.warning(self, "Error Extracting Text", f"An unexpected error occurred while extracting text from {file_path.split('/')[-1]}: {str(e)}")
-            return ""
+            QMessageBox.warning(self, "Error Extracting Text", f"An unexpected error occurred while extracting text from {get_file_name(file_path)}: {str(e)}")
+            return None
+
+        for title, message in document.warnings:
+            QMessageBox.warning(self, title, message)
+        return document
 
     def start_voice_input(self):
         self.voice_input_button.setEnabled(False) # Renamed from record_button for consistency
@@ -391,6 +625,7 @@ class AINoteSummarizer(QWidget):
                 self.note_input.setPlainText(self.original_note_text_before_voice + "\n\n" + recognized_text)
             else:
                 self.note_input.append("\n\n" + recognized_text)
+            self.note_input.document().setModified(True) # Summarize the editor text, including what was dictated
             QMessageBox.information(self, "Voice Input", "Voice input complete. Text added to your notes.")
         elif error:
             self.note_input.setPlainText(self.original_note_text_before_voice)
@@ -414,57 +649,32 @@ class AINoteSummarizer(QWidget):
             return
 
         genai.configure(api_key=self.api_key)
-        model = genai.GenerativeModel("gemini-1.5-flash")
+        model = MeteredModel(self.create_model()) # Counts tokens for the per-user budget
 
         self.summary_output.setPlainText("Generating summary with Gemini 1.5 Flash...")
+        self._set_summarizing(True) # The waits below pump events; no second summary or upload may start meanwhile
         QApplication.processEvents()
 
         try:
-            contents = []
-            if self.current_image:
-                prompt = "Please provide a concise summary and description of this image, identifying key objects, scenes, and any visible text. Aim for clarity and conciseness, and structure the summary in bullet points or short paragraphs."
-                contents = [prompt, self.current_image] # Pass Pillow Image object directly
+            with memory_report.track("summarize"):
+                summary = self._generate_summary(model)
+            if summary is None:
+                return # Nothing to summarize or cancelled; the reason is already shown
+
+            if summary:
+                self.summary_output.setPlainText(summary)
+                self.remember_summary(summary)
             else:
-                note_text = self.note_input.toPlainText().strip()
-                if not note_text:
-                    self.summary_output.setPlainText("Please enter a note, upload a document, or load an image to summarize.")
-                    return
-
-                if len(note_text) > MAX_INPUT_LENGTH:
-                    self.summary_output.setPlainText(
-                        f"Input too long ({len(note_text)} characters).\n"
-                        f"Maximum recommended length for optimal performance: {MAX_INPUT_LENGTH} characters.\n"
-                        "Please shorten your text or split it into smaller parts."
-                    )
-                    return
-
-                prompt = (f"Please provide a comprehensive summary of the following text, "
-                          f"including key points and main ideas. Aim for clarity and conciseness, "
-                          f"and and structure the summary with bullet points or short paragraphs:\n\n{note_text}")
-                contents = [prompt]
-
-            if contents:
-                response = model.generate_content(
-                    contents,
-                    generation_config={
-                        "max_output_tokens": MAX_OUTPUT_TOKENS,
-                        "temperature": 0.3,
-                    }
-                )
-
-                if response.text:
-                    summary = response.text.strip()
-                    self.summary_output.setPlainText(summary)
-                else:
-                    self.summary_output.setPlainText("No summary was generated. The AI might not have found enough content or encountered an internal issue.")
+                self.summary_output.setPlainText("No summary was generated. The AI might not have found enough content or encountered an internal issue.")
 
-                self.summary_output.verticalScrollBar().setValue(0)
-            else:
-                self.summary_output.setPlainText("No content to summarize.")
+            self.summary_output.verticalScrollBar().setValue(0)
 
         except Exception as e:
             error_message = str(e)
-            if "quota" in error_message.lower():
+            if isinstance(e, KeysExhaustedError):
+                self.summary_output.setPlainText(f"Error: {error_message}")
+                QMessageBox.warning(self, "Rate Limited", error_message)
+            elif "quota" in error_message.lower():
                 self.summary_output.setPlainText(f"Error: You have exceeded your API quota. Please wait or check your Google Cloud Console for details.\n\n{error_message}")
                 QMessageBox.critical(self, "API Quota Exceeded", "You have exceeded your Gemini API quota. Please try again later or check your billing details on Google Cloud.")
             elif "authentication" in error_message.lower() or "api key" in error_message.lower():
@@ -475,7 +685,250 @@ class AINoteSummarizer(QWidget):
                                                  "Please check your internet connection or try a shorter text.")
                 QMessageBox.critical(self, "Summarization Error", f"An unexpected error occurred: {e}")
         finally:
-            pass
+            self._set_summarizing(False)
+            record_token_usage(self.username, model.input_tokens, model.output_tokens)
+            self._print_memory_report()
+
+    def _set_summarizing(self, busy):
+        self.upload_button.setEnabled(not busy)
+        self.summarize_button.setEnabled(not busy)
+        self.queue_button.setEnabled(not busy)
+
+    def _generate_summary(self, model):
+        """Runs the right summary for what is loaded. Returns None when nothing was sent."""
+        if self.current_image:
+            if not self.confirm_token_budget(IMAGE_TOKENS + MAX_OUTPUT_TOKENS):
+                return None
+            return summarize_image(model, self.current_image) # Encoded once at load time
+        if self.current_stream_path and not self.note_input.document().isModified():
+            # The editor only holds a preview; summarize the whole file straight from disk
+            plan = plan_stream_summary(os.path.getsize(self.current_stream_path))
+            if not self.confirm_token_budget(plan.estimated_tokens):
+                return None
+            return summarize_stream(model, self.current_stream_path, self._show_chunk_progress)
+
+        note_text = self.current_note_text()
+        if not note_text:
+            self.summary_output.setPlainText("Please enter a note, upload a document, or load an image to summarize.")
+            return None
+
+        if self.duplicate_update and not self.note_input.document().isModified():
+            # Diff-only update of a near-duplicate's earlier summary
+            match, changes = self.duplicate_update
+            self.duplicate_update = None
+            if not self.confirm_token_budget(estimate_tokens(match["summary"]) + estimate_tokens(changes) + MAX_OUTPUT_TOKENS):
+                return None
+            self.summary_output.setPlainText(f"Updating the summary of '{match['title']}' from the changes...")
+            QApplication.processEvents()
+            return update_summary(model, match["summary"], changes)
+
+        summary = self._speculative_result(note_text)
+        if summary:
+            return summary # Already summarized in the background; its tokens were recorded then
+
+        # Pre-flight: the token estimate decides between one call and a chunked summary
+        plan = plan_text_summary(note_text)
+        if not self.confirm_token_budget(plan.estimated_tokens):
+            return None
+        if plan.mode == "chunked":
+            self.summary_output.append(f"Long input (~{plan.input_tokens:,} tokens): summarizing in {plan.chunk_count} parts...")
+            QApplication.processEvents()
+        return summarize_text(model, note_text, plan=plan, on_progress=self._show_chunk_progress)
+
+    def toggle_speculative(self, enabled):
+        self.speculative_button.setText("⚡ Pre-summarize: On" if enabled else "⚡ Pre-summarize: Off")
+        if enabled:
+            self.start_speculative_summary()
+        else:
+            self.speculative.invalidate()
+
+    def start_speculative_summary(self):
+        """
+        Starts summarizing the extracted document in the background when pre-summarize is on.
+        Runs that would push the user past the daily warning level are skipped, since there is
+        nobody to confirm them.
+        """
+        if not (self.speculative_button.isChecked() and self.api_key and self.current_document):
+            return
+        if self.note_input.document().isModified():
+            return
+        text = self.current_document.text
+        plan = plan_text_summary(text)
+        if self.username:
+            used = get_token_usage(self.username, start_of_today())
+            if used + plan.estimated_tokens > DAILY_TOKEN_QUOTA * QUOTA_WARNING_RATIO:
+                self.summary_output.append("Pre-summarize skipped: it would use most of your daily token budget.")
+                return
+        genai.configure(api_key=self.api_key)
+        self.speculative.start(text, plan)
+        self.summary_output.append("⚡ Summarizing in the background...")
+
+    def _speculative_result(self, note_text):
+        """A background summary of note_text, waiting for one still in progress. None if there isn't one."""
+        summary = self.speculative.cached(note_text)
+        if summary or not self.speculative.is_running(note_text):
+            return summary
+        self.summary_output.setPlainText("Finishing the summary started in the background...")
+        while self.speculative.is_running(note_text):
+            summary = self.speculative.wait(note_text, SPECULATIVE_POLL_SECONDS)
+            if summary:
+                return summary
+            QApplication.processEvents() # Keep the window responsive; an edit here invalidates the run
+        return self.speculative.cached(note_text)
+
+    def _record_speculative_usage(self, input_tokens, output_tokens):
+        # Called from the speculative worker thread; db_manager opens its own connection per call
+        if self.username:
+            record_token_usage(self.username, input_tokens, output_tokens)
+
+    def confirm_token_budget(self, estimated_tokens):
+        """
+        Checks a summary's estimated tokens against the user's daily budget.
+        Warns when the budget is nearly used and asks before going over it. Returns False to cancel.
+        """
+        if not self.username:
+            return True
+        used = get_token_usage(self.username, start_of_today())
+        if used + estimated_tokens > DAILY_TOKEN_QUOTA:
+            reply = QMessageBox.question(self, "Token Budget",
+                                         f"This summary needs about {estimated_tokens:,} tokens, and you have already used "
+                                         f"{used:,} of your {DAILY_TOKEN_QUOTA:,} daily tokens.\n\n"
+                                         "Going over may hit your Gemini API quota. Continue anyway?",
+                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if reply != QMessageBox.Yes:
+                self.summary_output.setPlainText("Summary cancelled: daily token budget would be exceeded.")
+                return False
+        elif used + estimated_tokens > DAILY_TOKEN_QUOTA * QUOTA_WARNING_RATIO:
+            percent = (used + estimated_tokens) * 100 // DAILY_TOKEN_QUOTA
+            self.summary_output.append(f"Heads up: about {percent}% of your daily token budget will be used after this summary.")
+            QApplication.processEvents()
+        return True
+
+    def _show_chunk_progress(self, done, total):
+        self.summary_output.setPlainText(f"Summarizing part {done} of {total}...")
+        QApplication.processEvents()
+
+    def load_large_text_file(self, file_path):
+        """Shows a preview of a large TXT/RTF file without reading all of it; the file itself is summarized on demand."""
+        try:
+            with StreamedTextFile(file_path) as stream:
+                preview = stream.preview(PREVIEW_CHARS)
+                size_mb = stream.size / (1024 * 1024)
+        except Exception as e:
+            QMessageBox.warning(self, "Error Extracting Text", f"An unexpected error occurred while reading {get_file_name(file_path)}: {str(e)}")
+            self.summary_output.setPlainText("Failed to extract text.")
+            return
+
+        self.current_stream_path = file_path
+        self.note_input.setPlainText(preview)
+        self.note_input.document().setModified(False) # Editing the preview switches back to summarizing the editor text
+        if stream.size > STREAM_FULL_LIMIT_BYTES:
+            mode_note = f"a {LARGE_FILE_SAMPLING_MODE} sample of the file will be summarized in chunks"
+        else:
+            mode_note = "the whole file will be summarized in chunks"
+        self.summary_output.setPlainText(f"Large file loaded ({size_mb:.1f} MB). Showing the first {len(preview)} characters; "
+                                         f"{mode_note}. You can now summarize.")
+
+    def create_model(self):
+        if self.key_scheduler:
+            # Each call goes to the key with the most headroom; on the GUI thread it never waits for one
+            return ScheduledModel(self.key_scheduler, MODEL_NAME, fail_fast_thread=threading.main_thread())
+        return create_gemini_model(MODEL_NAME) # Live Gemini unless a stand-in backend is configured
+
+    def set_user(self, username):
+        """Called by LoginPage after login; starts background workers for this user's queued jobs."""
+        self.stop_job_workers()
+        self.username = username
+        self.start_job_workers()
+        self.update_jobs_button()
+
+    def start_job_workers(self):
+        if not self.username or not self.api_key:
+            return # Jobs wait in the queue until both a user and an API key are set
+        if self.job_workers and self.job_workers.username != self.username:
+            self.stop_job_workers()
+        if self.job_workers is None:
+            key_count = len(self.key_scheduler.keys) if self.key_scheduler else 1
+            self.job_workers = JobWorkerPool(self.job_queue, partial(run_summary_job, self.create_model),
+                                             worker_count=JOB_WORKER_COUNT * key_count, username=self.username)
+        self.job_workers.start()
+
+    def stop_job_workers(self):
+        if self.job_workers:
+            self.job_workers.stop(wait=False) # Running jobs are recovered on the next start if the app closes
+            self.job_workers = None
+
+    def queue_summary(self):
+        """Adds the current note, file or image to the background job queue."""
+        if not self.username:
+            return
+        if self.current_image or (self.current_stream_path and not self.note_input.document().isModified()):
+            # Images and large files are read again by the worker instead of being copied into the queue
+            payload = {"file_path": self.current_file_path}
+            title = get_file_name(self.current_file_path)
+        else:
+            note_text = self.current_note_text()
+            if not note_text:
+                self.summary_output.setPlainText("Please enter a note, upload a document, or load an image to summarize.")
+                return
+            payload = {"text": note_text}
+            title = get_file_name(self.current_file_path) if self.current_file_path else note_text[:40].replace("\n", " ")
+
+        job_id = self.job_queue.enqueue(self.username, payload, title=title)
+        message = f"Summary job #{job_id} queued. You can keep working or close the app; results are under '🗂️ Jobs'."
+        if not self.api_key:
+            message += "\nSet your Gemini API Key in the API Settings to start processing."
+        self.summary_output.setPlainText(message)
+        self.update_jobs_button()
+
+    def toggle_folder_watch(self):
+        """Starts watching a folder chosen by the user, or stops the current watch."""
+        if self.folder_watcher:
+            self.stop_folder_watch()
+            self.summary_output.setPlainText("Stopped watching the folder.")
+            return
+        if not self.username:
+            return
+        folder = QFileDialog.getExistingDirectory(self, "Choose a Folder to Watch")
+        if not folder:
+            return
+        try:
+            self.folder_watcher = FolderWatcher(folder, self.job_queue, self.username)
+        except Exception as e:
+            QMessageBox.warning(self, "Watch Folder Error", f"Could not watch {folder}.\nError: {str(e)}")
+            return
+        self.folder_watcher.start()
+        self.watch_button.setText(f"👁️ Watching: {get_file_name(folder)}")
+        message = (f"Watching {folder}. New or changed files are summarized in the background once they "
+                   "finish copying; results are under '🗂️ Jobs'.")
+        if not self.api_key:
+            message += "\nSet your Gemini API Key in the API Settings to start processing."
+        self.summary_output.setPlainText(message)
+
+    def stop_folder_watch(self):
+        if self.folder_watcher:
+            self.folder_watcher.stop(wait=False)
+            self.folder_watcher = None
+        self.watch_button.setText("👁️ Watch Folder")
+
+    def show_jobs_dialog(self):
+        if not self.username:
+            return
+        dialog = JobsDialog(self.job_queue, self.username, self.is_dark_theme, self._open_job_result, self)
+        dialog.exec_()
+        self.update_jobs_button()
+
+    def _open_job_result(self, title, summary):
+        self.summary_output.setPlainText(summary)
+        self.summary_output.verticalScrollBar().setValue(0)
+
+    def update_jobs_button(self):
+        if not self.username:
+            self.jobs_button.setText("🗂️ Jobs")
+            return
+        counts = self.job_queue.count_by_status(self.username)
+        active = counts.get(STATUS_QUEUED, 0) + counts.get(STATUS_RUNNING, 0)
+        self.jobs_button.setText(f"🗂️ Jobs ({active} active)" if active else "🗂️ Jobs")
 
     def export_to_txt(self): # Renamed from export_to_pdf
         summary_text = self.summary_output.toPlainText()
@@ -499,12 +952,22 @@ class AINoteSummarizer(QWidget):
 
     def logout(self):
         """Logs out the user and returns to the login page."""
+        self.cancel_extraction()
         self.stacked_widget.setCurrentIndex(0) # Go back to Login Page
         self.note_input.clear() # Clear input for next session
         self.summary_output.clear() # Clear output
         self.current_image = None # Clear any loaded image
+        self.current_document = None
+        self.current_signature = None
+        self.duplicate_update = None
+        self.current_stream_path = None
+        self.current_file_path = None
         self.image_display_label.clear() # Clear the image from the label
         self.image_display_label.hide() # Hide the image label
+        self.stop_job_workers() # Queued jobs stay in the database for the next login
+        self.stop_folder_watch() # The checkpoint remembers what was already queued
+        self.speculative.clear() # Background summaries belong to this session
+        self.username = None
         # Optionally, reset theme to default for login page:
         login_page = self.stacked_widget.widget(0)
         login_page.is_dark_theme = False # Ensure login page starts in light mode
@@ -1,5 +1,6 @@
 import sqlite3
 import hashlib
+import time
 
 DATABASE_NAME = 'users.db'
 
@@ -14,6 +15,16 @@ def init_db():
             password_hash TEXT NOT NULL
         )
     ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS token_usage (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            input_tokens INTEGER NOT NULL,
+            output_tokens INTEGER NOT NULL,
+            created_at REAL NOT NULL
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_token_usage_user ON token_usage (username, created_at)")
     conn.commit()
     conn.close()
 
@@ -52,5 +63,28 @@ def authenticate_user_db(username, password_hash):
     conn.close()
     return user # Returns (username,) tuple if found, otherwise None
 
+def record_token_usage(username, input_tokens, output_tokens):
+    """Stores the tokens one summary used for a user."""
+    if not username or not (input_tokens or output_tokens):
+        return
+    conn = sqlite3.connect(DATABASE_NAME)
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO token_usage (username, input_tokens, output_tokens, created_at) VALUES (?, ?, ?, ?)",
+                   (username, input_tokens, output_tokens, time.time()))
+    conn.commit()
+    conn.close()
+
+def get_token_usage(username, since):
+    """
+    Returns the total tokens (input + output) a user has used since the given timestamp.
+    """
+    conn = sqlite3.connect(DATABASE_NAME)
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(SUM(input_tokens + output_tokens), 0) FROM token_usage WHERE username = ? AND created_at >= ?",
+                   (username, since))
+    total = cursor.fetchone()[0]
+    conn.close()
+    return total
+
 # Initialize the database when the module is imported
 init_db()
\ No newline at end of file
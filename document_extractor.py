@@ -0,0 +1,156 @@
+import re
+from functools import partial
+import xml.etree.ElementTree as ET
+
+import fitz # For PDF
+import pptx # For PPTX
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from striprtf.striprtf import rtf_to_text # For RTF
+
+from document_model import StructuredDocument
+from docx_stream import iter_docx_blocks, DocxFormatError, CELL_SEPARATOR # For DOCX
+from table_profiler import profile_csv, iter_xlsx_profiles
+
+TEXT_EXTENSIONS = ("pdf", "pptx", "txt", "docx", "rtf", "xlsx", "csv")
+IMAGE_EXTENSIONS = ("png", "jpg", "jpeg")
+
+_PARAGRAPH_BREAK = re.compile(r"\n(?:[ \t]*\r?\n)+") # Blank lines only, so the next line keeps its indentation
+
+
+class ExtractionError(Exception):
+    """Raised when a file can't be turned into a document. Carries a dialog title and message."""
+    def __init__(self, title, message):
+        super().__init__(message)
+        self.title = title
+        self.message = message
+
+
+def get_file_extension(file_path):
+    return file_path.lower().split('.')[-1]
+
+
+def get_file_name(file_path):
+    return file_path.replace("\\", "/").split('/')[-1]
+
+
+class ExtractionCancelled(Exception):
+    """Raised inside extract_document when its is_cancelled callback returns True."""
+
+
+def extract_document(file_path, on_progress=None, is_cancelled=None, on_block=None):
+    """
+    Extracts a file into a StructuredDocument, keeping page, slide, sheet and
+    paragraph boundaries as blocks. Raises ExtractionError for unreadable or
+    unsupported files; recoverable problems are recorded in document.warnings.
+
+    on_progress(done, total, location) is called after every page, slide, paragraph
+    or chunk of table rows (total is None when it isn't known up front), and
+    on_block(block, text) as each block is added. If is_cancelled() returns True
+    at one of those points, ExtractionCancelled is raised.
+    """
+    file_extension = get_file_extension(file_path)
+    # Plain text keeps a blank line between paragraphs, like the original file
+    document = StructuredDocument(file_path, "\n\n" if file_extension in ("txt", "rtf") else "\n", on_block)
+
+    def report(done, total, location):
+        if is_cancelled is not None and is_cancelled():
+            raise ExtractionCancelled()
+        if on_progress is not None:
+            on_progress(done, total, location)
+
+    if file_extension == "pdf":
+        try:
+            pdf = fitz.open(file_path)
+            try:
+                for page_number, page in enumerate(pdf, start=1):
+                    document.add_block("page", page.get_text("text"), f"page {page_number}")
+                    report(page_number, pdf.page_count, f"page {page_number}")
+            finally:
+                pdf.close()
+        except ExtractionCancelled:
+            raise
+        except Exception as pdf_e:
+            raise ExtractionError("PDF Read Error",
+                                  f"Could not read PDF file. It might be corrupted or encrypted: {pdf_e}")
+    elif file_extension == "pptx":
+        prs = pptx.Presentation(file_path)
+        slide_count = len(prs.slides)
+        for slide_number, slide in enumerate(prs.slides, start=1):
+            for kind, text, location in _iter_slide_blocks(slide, f"slide {slide_number}"):
+                document.add_block(kind, text, location)
+            report(slide_number, slide_count, f"slide {slide_number}")
+    elif file_extension == "txt":
+        with open(file_path, 'r', encoding='utf-8') as f:
+            _add_paragraphs(document, f.read(), report)
+    elif file_extension == "docx":
+        # Streams word/document.xml, headers and footers instead of building the python-docx object model
+        try:
+            for block_number, (kind, text, location) in enumerate(iter_docx_blocks(file_path), start=1):
+                document.add_block(kind, text, location)
+                report(block_number, None, location)
+        except (DocxFormatError, ET.ParseError) as docx_e:
+            raise ExtractionError("DOCX Read Error",
+                                  f"Could not read Word document. It might be corrupted or not a .docx file: {docx_e}")
+    elif file_extension == "rtf":
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            rtf_content = f.read()
+        try:
+            plain_text = rtf_to_text(rtf_content)
+        except Exception as rtf_e:
+            document.warnings.append(("RTF Error", f"Could not parse RTF content. May contain unsupported elements.\nError: {rtf_e}"))
+            document.add_block("text", rtf_content, "raw rtf") # Fallback to raw RTF if parsing fails
+        else:
+            _add_paragraphs(document, plain_text, report)
+    elif file_extension == "xlsx":
+        # Send a compact per-sheet profile instead of every cell
+        for sheet_name, profile in iter_xlsx_profiles(file_path, on_chunk=partial(_report_sheet_rows, report)):
+            document.add_block("table", profile, f"sheet {sheet_name}")
+    elif file_extension == "csv":
+        # Chunked statistical profile; dumping the whole table blows past the prompt limit
+        document.add_block("table", profile_csv(file_path, on_chunk=partial(_report_rows, report)), get_file_name(file_path))
+    else:
+        raise ExtractionError("Unsupported File Type",
+                              f"File type '.{file_extension}' is not supported for text extraction.")
+
+    return document
+
+
+def _report_sheet_rows(report, sheet_name, rows):
+    report(rows, None, f"sheet {sheet_name}, {rows:,} rows")
+
+
+def _report_rows(report, rows):
+    report(rows, None, f"{rows:,} rows")
+
+
+def _iter_slide_blocks(slide, location):
+    """
+    (kind, text, location) for a slide: text frames of every shape, including shapes nested
+    in groups, one "table row" block per table row, then the speaker notes.
+    """
+    yield from _iter_shape_blocks(slide.shapes, location)
+    if slide.has_notes_slide:
+        notes = slide.notes_slide.notes_text_frame # None when the notes page has no body placeholder
+        if notes is not None:
+            yield "notes", notes.text, f"{location} notes"
+
+
+def _iter_shape_blocks(shapes, location):
+    for shape in shapes:
+        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            yield from _iter_shape_blocks(shape.shapes, location)
+        elif getattr(shape, "has_table", False):
+            for row_number, row in enumerate(shape.table.rows, start=1):
+                cells = [cell.text.strip() for cell in row.cells]
+                if any(cells):
+                    yield "table row", CELL_SEPARATOR.join(cells), f"{location} table row {row_number}"
+        elif shape.has_text_frame:
+            yield "slide", shape.text_frame.text, location
+
+
+def _add_paragraphs(document, text, report):
+    paragraphs = _PARAGRAPH_BREAK.split(text)
+    for paragraph_number, paragraph in enumerate(paragraphs, start=1):
+        # Only the blank lines between paragraphs go; indentation of code and nested lists stays
+        document.add_block("paragraph", paragraph, f"paragraph {paragraph_number}", strip=False)
+        report(paragraph_number, len(paragraphs), f"paragraph {paragraph_number}")
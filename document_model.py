@@ -0,0 +1,107 @@
+import re
+
+_LEADING_BLANK_LINES = re.compile(r"\A(?:[ \t]*\r?\n)+")
+
+
+class DocumentBlock:
+    """
+    One natural unit of a document (a page, slide shape, paragraph, table...).
+    The block doesn't own its text; it points into the document's shared buffer.
+    """
+    __slots__ = ("kind", "location", "start", "end")
+
+    def __init__(self, kind, location, start, end):
+        self.kind = kind # e.g. "page", "slide", "paragraph", "table"
+        self.location = location # Human readable source position, e.g. "slide 3"
+        self.start = start # Offset of the first character in the shared buffer
+        self.end = end # Offset one past the last character
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __repr__(self):
+        return f"DocumentBlock({self.kind!r}, {self.location!r}, {self.start}, {self.end})"
+
+
+class StructuredDocument:
+    """
+    An extracted document: one shared text buffer plus a list of blocks that
+    record where each page/slide/sheet/paragraph lives inside it.
+    Blocks are separated by `separator` in the buffer.
+    """
+    def __init__(self, source="", separator="\n", on_block=None):
+        self.source = source # File the document was extracted from
+        self.separator = separator
+        self.on_block = on_block # Called with (block, text) as blocks are added, e.g. to stream them to a UI
+        self.blocks = []
+        self.warnings = [] # (title, message) pairs raised while extracting
+        self._parts = [] # Pending block texts, joined once into the buffer on first access
+        self._length = 0
+
+    def add_block(self, kind, text, location="", strip=True):
+        """
+        Appends a block; whitespace-only text is skipped. Returns the new block or None.
+        With strip=False only blank lines around the text are removed, so indentation survives.
+        """
+        if not text.strip():
+            return None
+        text = text.strip() if strip else _LEADING_BLANK_LINES.sub("", text).rstrip()
+        if self.blocks:
+            self._parts.append(self.separator)
+            self._length += len(self.separator)
+        start = self._length
+        self._parts.append(text)
+        self._length += len(text)
+        block = DocumentBlock(kind, location, start, self._length)
+        self.blocks.append(block)
+        if self.on_block is not None:
+            self.on_block(block, text)
+        return block
+
+    @property
+    def text(self):
+        """The whole document as one string (built once, then shared)."""
+        if len(self._parts) != 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0]
+
+    def __len__(self):
+        return self._length
+
+    def block_text(self, block):
+        return self.text[block.start:block.end]
+
+    def iter_blocks(self, kind=None):
+        """Yields blocks in document order, optionally only those of one kind."""
+        for block in self.blocks:
+            if kind is None or block.kind == kind:
+                yield block
+
+    def chunk_ranges(self, max_chars):
+        """
+        Groups consecutive blocks into (start, end) ranges of at most max_chars,
+        breaking only on block boundaries unless a single block is itself too long.
+        """
+        ranges = []
+        chunk_start = None
+        chunk_end = None
+        for block in self.blocks:
+            if chunk_start is not None and block.end - chunk_start > max_chars:
+                ranges.append((chunk_start, chunk_end))
+                chunk_start = None
+            if chunk_start is None:
+                chunk_start = block.start
+                # Oversized block: cut it into fixed-size pieces
+                while block.end - chunk_start > max_chars:
+                    ranges.append((chunk_start, chunk_start + max_chars))
+                    chunk_start += max_chars
+            chunk_end = block.end
+        if chunk_start is not None:
+            ranges.append((chunk_start, chunk_end))
+        return ranges
+
+    def iter_chunks(self, max_chars):
+        """Yields chunk texts built from chunk_ranges()."""
+        text = self.text
+        for start, end in self.chunk_ranges(max_chars):
+            yield text[start:end]
@@ -0,0 +1,101 @@
+import threading
+import time
+
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+
+from document_extractor import extract_document, get_file_name, ExtractionError, ExtractionCancelled
+from memory_budget import memory_report
+
+PROGRESS_INTERVAL = 0.1 # Seconds between progress/text signals, so big files don't flood the GUI event loop
+STREAM_CHAR_LIMIT = 20000 # Characters streamed to the editor while extracting; the rest arrives with the result
+
+
+class ExtractionWorker(QObject):
+    """
+    Runs extract_document on a QThread. Progress and the first stretch of text are
+    sent back as signals while extraction runs; cancel() can be called from any thread.
+    """
+    progress = pyqtSignal(int, int, str) # done, total (0 when unknown), location
+    text_ready = pyqtSignal(str) # Newly extracted text, blocks separated by blank lines
+    finished = pyqtSignal(object, object) # StructuredDocument, after_extract result (None without one)
+    failed = pyqtSignal(str, str) # Dialog title, message
+    cancelled = pyqtSignal()
+
+    def __init__(self, file_path, stream_char_limit=STREAM_CHAR_LIMIT, after_extract=None):
+        super().__init__()
+        self.file_path = file_path
+        self.after_extract = after_extract # after_extract(document), run here too so slow follow-up work stays off the GUI thread
+        self.stream_char_limit = stream_char_limit
+        self._cancel_event = threading.Event()
+        self._pending_text = []
+        self._streamed_chars = 0
+        self._last_emit = 0.0
+        self._last_progress = None
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
+
+    def run(self):
+        try:
+            with memory_report.track("extract"):
+                document = extract_document(self.file_path, self._on_progress, self.is_cancelled, self._on_block)
+        except ExtractionCancelled:
+            self.cancelled.emit()
+            return
+        except ExtractionError as e:
+            self.failed.emit(e.title, e.message)
+            return
+        except Exception as e:
+            self.failed.emit("Error Extracting Text",
+                             f"An unexpected error occurred while extracting text from {get_file_name(self.file_path)}: {str(e)}")
+            return
+        self._flush()
+        extra = None
+        if self.after_extract is not None and not self.is_cancelled():
+            try:
+                extra = self.after_extract(document)
+            except Exception:
+                extra = None # Follow-up work is optional; the document itself is still good
+        self.finished.emit(document, extra)
+
+    def _on_block(self, block, text):
+        if self._streamed_chars >= self.stream_char_limit:
+            return
+        if self._streamed_chars:
+            text = "\n\n" + text # Blocks are shown as paragraphs while streaming
+        text = text[:self.stream_char_limit - self._streamed_chars]
+        self._pending_text.append(text)
+        self._streamed_chars += len(text)
+
+    def _on_progress(self, done, total, location):
+        self._last_progress = (done, total or 0, location)
+        if time.monotonic() - self._last_emit >= PROGRESS_INTERVAL:
+            self._flush()
+
+    def _flush(self):
+        self._last_emit = time.monotonic()
+        if self._pending_text:
+            self.text_ready.emit("".join(self._pending_text))
+            self._pending_text = []
+        if self._last_progress is not None:
+            self.progress.emit(*self._last_progress)
+            self._last_progress = None
+
+
+def start_extraction(file_path, parent=None, after_extract=None):
+    """
+    Creates a worker and the QThread it runs on. Connect the worker's signals, then call
+    thread.start(). The thread quits and both objects are deleted once the worker is done.
+    """
+    thread = QThread(parent)
+    worker = ExtractionWorker(file_path, after_extract=after_extract)
+    worker.moveToThread(thread)
+    thread.started.connect(worker.run)
+    for done_signal in (worker.finished, worker.failed, worker.cancelled):
+        done_signal.connect(thread.quit)
+    thread.finished.connect(worker.deleteLater)
+    thread.finished.connect(thread.deleteLater)
+    return thread, worker
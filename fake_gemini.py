@@ -0,0 +1,51 @@
+import time
+
+
+class FakeUsage:
+    """Mimics response.usage_metadata."""
+    def __init__(self, prompt_token_count=0, candidates_token_count=0):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+
+
+class FakeResponse:
+    """Mimics the parts of a Gemini response the app reads: .text and iteration over streamed chunks."""
+    def __init__(self, pieces, delay=0.0, usage_metadata=None):
+        self.pieces = pieces
+        self._delay = delay
+        self.text = "".join(pieces)
+        self.usage_metadata = usage_metadata
+
+    def __iter__(self):
+        for piece in self.pieces:
+            if self._delay:
+                time.sleep(self._delay)
+            yield FakeResponse([piece])
+
+
+class FakeGeminiModel:
+    """
+    A local, offline stand-in for genai.GenerativeModel. It "summarizes" by echoing
+    the last words of the prompt, so the app and the HTTP service can be
+    exercised without an API key or network.
+    """
+    def __init__(self, latency=0.0, words=40, stream_pieces=5):
+        self.latency = latency # Seconds spent before answering, spread over streamed pieces
+        self.words = words
+        self.stream_pieces = stream_pieces
+        self.calls = 0
+
+    def generate_content(self, contents, generation_config=None, stream=False):
+        self.calls += 1
+        text_parts = [part for part in contents if isinstance(part, str)]
+        words = " ".join(text_parts).split()
+        summary = "- " + " ".join(words[-self.words:]) if words else "- (no text)"
+        usage = FakeUsage(len(words), len(summary.split()))
+
+        piece_size = max(1, len(summary) // self.stream_pieces + 1)
+        pieces = [summary[i:i + piece_size] for i in range(0, len(summary), piece_size)]
+        if stream:
+            return FakeResponse(pieces, self.latency / len(pieces), usage)
+        if self.latency:
+            time.sleep(self.latency)
+        return FakeResponse(pieces, usage_metadata=usage)
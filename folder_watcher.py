@@ -0,0 +1,294 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from functools import partial
+
+from db_manager import DATABASE_NAME
+from document_extractor import TEXT_EXTENSIONS, IMAGE_EXTENSIONS, get_file_extension, get_file_name
+from job_queue import JobQueue, JobWorkerPool, run_summary_job, STATUS_FAILED, STATUS_CANCELLED
+
+# The watch checkpoint lives next to users.db
+WATCH_DATABASE_NAME = os.path.join(os.path.dirname(DATABASE_NAME), 'watch.db')
+
+POLL_INTERVAL_SECONDS = 2.0
+STABLE_SECONDS = 5.0 # A file must keep the same size and mtime this long before it is picked up
+HASH_BLOCK_BYTES = 1024 * 1024
+WATCH_EXTENSIONS = TEXT_EXTENSIONS + IMAGE_EXTENSIONS # Everything upload_document accepts
+# Office lock files, hidden files and in-progress downloads/copies
+IGNORED_PREFIXES = ("~$", ".")
+IGNORED_SUFFIXES = (".tmp", ".part", ".crdownload", ".partial")
+SUMMARY_SUFFIX = ".summary.txt" # Summaries written by --output; never summarized themselves
+
+
+def file_fingerprint(path):
+    """SHA-256 of the file contents, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_watchable(name):
+    lowered = name.lower()
+    if lowered.startswith(IGNORED_PREFIXES) or lowered.endswith(IGNORED_SUFFIXES + (SUMMARY_SUFFIX,)):
+        return False
+    return get_file_extension(lowered) in WATCH_EXTENSIONS
+
+
+class FolderWatcher:
+    """
+    Polls a folder and queues a summary job for every new or changed file once it has
+    stopped growing. A SQLite checkpoint remembers each file's size, mtime and content
+    hash, so a restart only picks up what changed while the watcher was away, and a file
+    whose bytes were already summarized (a copy, or a save without edits) is skipped.
+    Subfolders in excluded_folders (e.g. where summaries are written) are skipped, as are
+    *.summary.txt files anywhere.
+    """
+    def __init__(self, folder, job_queue, username, database=WATCH_DATABASE_NAME, recursive=False,
+                 poll_interval=POLL_INTERVAL_SECONDS, stable_seconds=STABLE_SECONDS, on_enqueue=None,
+                 excluded_folders=()):
+        self.folder = os.path.abspath(folder)
+        self.excluded_folders = {os.path.abspath(path) for path in excluded_folders}
+        self.job_queue = job_queue
+        self.username = username
+        self.database = database
+        self.recursive = recursive
+        self.poll_interval = poll_interval
+        self.stable_seconds = stable_seconds
+        self.on_enqueue = on_enqueue # Called with (job_id, path) from the watcher thread
+        self._pending = {} # path -> (size, mtime, time first seen with that size/mtime)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS watched_files (
+                    username TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    job_id INTEGER,
+                    processed_at REAL NOT NULL,
+                    PRIMARY KEY (username, path)
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_watched_hash ON watched_files (username, sha256)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.database, timeout=30)
+
+    def _iter_files(self):
+        if self.recursive:
+            for root, folders, names in os.walk(self.folder):
+                folders[:] = [name for name in folders if os.path.join(root, name) not in self.excluded_folders]
+                for name in names:
+                    if is_watchable(name):
+                        yield os.path.join(root, name)
+            return
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.is_file() and is_watchable(entry.name):
+                    yield entry.path
+
+    def _checkpoints(self):
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT path, size, mtime FROM watched_files WHERE username = ?", (self.username,)).fetchall()
+        finally:
+            conn.close()
+        return {path: (size, mtime) for path, size, mtime in rows}
+
+    def scan(self, enqueue=True):
+        """
+        One polling pass. Returns the ids of the jobs it queued. With enqueue=False, stable
+        new files are only checkpointed (used to skip an existing backlog).
+        """
+        now = time.time()
+        checkpoints = self._checkpoints()
+        seen = set()
+        queued = []
+        for path in self._iter_files():
+            seen.add(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue # Deleted or renamed between listing and stat
+            state = (stat.st_size, stat.st_mtime)
+            if checkpoints.get(path) == state:
+                self._pending.pop(path, None)
+                continue # Unchanged since it was processed
+
+            pending = self._pending.get(path)
+            if pending is None or pending[:2] != state:
+                self._pending[path] = state + (now,) # New or still being written: restart the debounce
+                continue
+            if now - pending[2] < self.stable_seconds:
+                continue
+
+            job_id = self._process(path, state, enqueue)
+            if job_id is not None:
+                queued.append(job_id)
+
+        for path in list(self._pending):
+            if path not in seen:
+                del self._pending[path]
+        return queued
+
+    def _process(self, path, state, enqueue):
+        try:
+            sha256 = file_fingerprint(path)
+        except OSError:
+            return None # Still locked by the writer (Windows) or gone; try again next pass
+        self._pending.pop(path, None)
+
+        conn = self._connect()
+        try:
+            job_ids = [job_id for (job_id,) in conn.execute(
+                "SELECT job_id FROM watched_files WHERE username = ? AND sha256 = ?", (self.username, sha256))]
+            already_done = self._covered(job_ids)
+            job_id = None
+            if enqueue and not already_done:
+                job_id = self.job_queue.enqueue(self.username, {"file_path": path}, title=get_file_name(path))
+            # Checkpoint after queueing: the job itself survives restarts in the job database
+            conn.execute("INSERT OR REPLACE INTO watched_files (username, path, size, mtime, sha256, job_id, processed_at) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (self.username, path, state[0], state[1], sha256, job_id, time.time()))
+            conn.commit()
+        finally:
+            conn.close()
+        if job_id is not None and self.on_enqueue is not None:
+            self.on_enqueue(job_id, path)
+        return job_id
+
+    def _covered(self, job_ids):
+        """
+        Whether earlier checkpoints of the same content make a new job unnecessary: one of
+        their jobs is queued, running or done. Checkpoints without a job (skip_existing) don't
+        count, and neither do jobs that failed, were cancelled or were deleted.
+        """
+        statuses = self.job_queue.statuses(job_id for job_id in job_ids if job_id is not None)
+        return any(status not in (STATUS_FAILED, STATUS_CANCELLED) for status in statuses.values())
+
+    def skip_existing(self):
+        """Checkpoints every file already in the folder without summarizing it."""
+        saved_stable_seconds = self.stable_seconds
+        self.stable_seconds = 0
+        try:
+            self.scan(enqueue=False) # First pass records sizes, the second checkpoints them
+            self.scan(enqueue=False)
+        finally:
+            self.stable_seconds = saved_stable_seconds
+
+    def start(self):
+        if self.is_running():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="folder-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=True):
+        self._stop_event.set()
+        if wait and self._thread:
+            self._thread.join()
+        self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.scan()
+            except (OSError, sqlite3.OperationalError):
+                pass # Folder briefly unavailable or database busy; try again on the next poll
+            self._stop_event.wait(self.poll_interval)
+
+
+def _print_queued(job_id, path):
+    print(f"Queued job #{job_id}: {path}")
+
+
+def _write_summary_handler(model_factory, output_folder, job):
+    # Job handler that also saves each summary as <file>.summary.txt in output_folder
+    summary = run_summary_job(model_factory, job)
+    path = job["payload"].get("file_path")
+    if path:
+        with open(os.path.join(output_folder, get_file_name(path) + SUMMARY_SUFFIX), "w", encoding="utf-8") as f:
+            f.write(summary)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a folder and summarize new or changed files into the job queue.")
+    parser.add_argument("folder")
+    parser.add_argument("--user", required=True, help="Username the queued jobs belong to (they show up in the app's Jobs list).")
+    parser.add_argument("--recursive", action="store_true", help="Also watch subfolders.")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL_SECONDS, help="Seconds between scans.")
+    parser.add_argument("--stable-seconds", type=float, default=STABLE_SECONDS,
+                        help="How long a file must stay unchanged before it is processed.")
+    parser.add_argument("--skip-existing", action="store_true", help="Checkpoint files already in the folder without summarizing them.")
+    parser.add_argument("--workers", type=int, default=2, help="Summary workers to run here (0 = only queue; the app processes them).")
+    parser.add_argument("--output", help="Also write each summary to <output>/<file>.summary.txt.")
+    parser.add_argument("--backend", default="live", help="Gemini backend: live (default), fake, record:<file> or replay:<file>.")
+    args = parser.parse_args()
+
+    from gemini_backend import create_model, set_backend_factory, backend_factory_from_spec
+    from key_scheduler import KeyScheduler, ScheduledModel, parse_api_keys
+
+    model_factory = create_model
+    if args.workers and (args.backend == "live" or args.backend.startswith("record:")):
+        api_keys = parse_api_keys(os.environ.get("GEMINI_API_KEY", ""))
+        if not api_keys:
+            parser.error("Set GEMINI_API_KEY (comma-separated for several keys), use --backend fake, or --workers 0.")
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_keys[0])
+        if len(api_keys) > 1 and args.backend == "live":
+            scheduler = KeyScheduler(api_keys)
+            model_factory = partial(ScheduledModel, scheduler)
+    set_backend_factory(backend_factory_from_spec(args.backend))
+
+    job_queue = JobQueue()
+    job_queue.recover_interrupted() # Only jobs whose lease expired; the app's running jobs are left alone
+    watcher = FolderWatcher(args.folder, job_queue, args.user, recursive=args.recursive, poll_interval=args.interval,
+                            stable_seconds=args.stable_seconds,
+                            on_enqueue=_print_queued,
+                            excluded_folders=[args.output] if args.output else ())
+    if args.skip_existing:
+        watcher.skip_existing()
+
+    workers = None
+    if args.workers:
+        if args.output:
+            os.makedirs(args.output, exist_ok=True)
+            handler = partial(_write_summary_handler, model_factory, args.output)
+        else:
+            handler = partial(run_summary_job, model_factory)
+        workers = JobWorkerPool(job_queue, handler, worker_count=args.workers, username=args.user)
+        workers.start()
+
+    print(f"Watching {watcher.folder} (Ctrl+C to stop)")
+    watcher.start()
+    try:
+        while watcher.is_running():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+        if workers:
+            workers.stop(wait=False) # Running jobs are picked up again once their leases expire
+
+
+if __name__ == '__main__':
+    main()
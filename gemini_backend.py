@@ -0,0 +1,224 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+from fake_gemini import FakeGeminiModel, FakeResponse, FakeUsage
+
+DEFAULT_MODEL_NAME = "gemini-1.5-flash"
+BACKEND_ENV_VAR = "KEYPOINT_GEMINI_BACKEND" # "live", "fake", "record:<file>" or "replay:<file>"
+
+_backend_factory = None # model_name -> model; None means the live Gemini API
+
+
+class QuotaExceededError(Exception):
+    """Injected stand-in for Gemini's 429 error; the message matches what the app checks for."""
+    def __init__(self, message="429 Resource has been exhausted (e.g. check quota)."):
+        super().__init__(message)
+
+
+class InjectedBackendError(Exception):
+    def __init__(self, message="503 The service is currently unavailable (injected)."):
+        super().__init__(message)
+
+
+def set_backend_factory(factory):
+    """
+    Replaces the backend behind create_model(). factory(model_name) must return an object
+    with generate_content(contents, generation_config=None, stream=False). Pass None to go live again.
+    """
+    global _backend_factory
+    _backend_factory = factory
+
+
+def create_model(model_name=DEFAULT_MODEL_NAME):
+    """The one place the app gets a model; every generate_content call goes through what this returns."""
+    if _backend_factory is not None:
+        return _backend_factory(model_name)
+    spec = os.environ.get(BACKEND_ENV_VAR)
+    if spec and spec != "live":
+        set_backend_factory(backend_factory_from_spec(spec))
+        return _backend_factory(model_name)
+
+    import google.generativeai as genai
+
+    return genai.GenerativeModel(model_name)
+
+
+def create_model_for_key(api_key, model_name=DEFAULT_MODEL_NAME):
+    """
+    A live model bound to one API key, independent of genai.configure(), so several keys
+    can be used side by side. Each call opens a gRPC channel: create one per key and reuse
+    it (KeyScheduler.model does), then release it with close_model_for_key().
+    Stand-in backends ignore the key.
+    """
+    if _backend_factory is not None or os.environ.get(BACKEND_ENV_VAR, "live") != "live":
+        return create_model(model_name)
+
+    import google.generativeai as genai
+
+    return _bind_sdk_model_to_key(genai.GenerativeModel(model_name), api_key)
+
+
+def close_model_for_key(model):
+    """Closes the gRPC channel of a model from create_model_for_key(); stand-in models are left alone."""
+    client = getattr(model, _SDK_CLIENT_ATTRIBUTE, None)
+    if client is not None:
+        client.transport.close()
+
+
+# --- google-generativeai adapter ---
+# The SDK (google-generativeai 0.x, tested with 0.8) only supports one global key set through
+# genai.configure(), and GenerativeModel has no public way to use another. Per-key models
+# therefore replace the model's private client attribute. This is the only code touching SDK
+# internals; if an upgrade renames the attribute, the multi-key path fails here with a clear
+# message instead of silently sending every request with the global key.
+_SDK_CLIENT_ATTRIBUTE = "_client"
+
+
+def _bind_sdk_model_to_key(model, api_key):
+    import google.ai.generativelanguage as glm
+
+    if not hasattr(model, _SDK_CLIENT_ATTRIBUTE):
+        raise RuntimeError("This google-generativeai version has no GenerativeModel._client; "
+                           "using several API keys needs google-generativeai 0.x.")
+    setattr(model, _SDK_CLIENT_ATTRIBUTE, glm.GenerativeServiceClient(client_options={"api_key": api_key}))
+    return model
+
+
+def backend_factory_from_spec(spec, **replay_options):
+    """Builds a factory from "live", "fake", "record:<cassette>" or "replay:<cassette>"."""
+    kind, _, path = spec.partition(":")
+    if kind == "live":
+        return None
+    if kind == "fake":
+        return lambda model_name: FakeGeminiModel()
+    if kind == "record" and path:
+        def recording_factory(model_name):
+            import google.generativeai as genai
+
+            return RecordingModel(genai.GenerativeModel(model_name), path)
+        return recording_factory
+    if kind == "replay":
+        replay = ReplayModel(path or None, **replay_options) # One shared instance keeps one cassette in memory
+        return lambda model_name: replay
+    raise ValueError(f"Unknown Gemini backend '{spec}'. Use live, fake, record:<file> or replay:<file>.")
+
+
+def request_key(contents, generation_config=None):
+    """Stable hash of a request, used to match recordings on replay."""
+    digest = hashlib.sha256()
+    for part in contents:
+        if isinstance(part, str):
+            digest.update(part.encode("utf-8"))
+        elif isinstance(part, dict) and "data" in part:
+            digest.update(part["data"]) # Encoded image blob
+        else:
+            # PIL images and other objects: type and size are enough to tell recordings apart
+            digest.update(f"<{type(part).__name__} {getattr(part, 'size', '')}>".encode("utf-8"))
+        digest.update(b"\0")
+    digest.update(json.dumps(generation_config or {}, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class RecordingModel:
+    """Passes calls to a real model and appends every response to a JSONL cassette for later replay."""
+    _lock = threading.Lock() # Shared by all recorders so concurrent writes don't interleave
+
+    def __init__(self, model, cassette_path):
+        self.model = model
+        self.cassette_path = cassette_path
+
+    def generate_content(self, contents, generation_config=None, stream=False):
+        response = self.model.generate_content(contents, generation_config=generation_config, stream=stream)
+        if stream:
+            return self._record_stream(contents, generation_config, response)
+        self._save(contents, generation_config, [response.text] if response.text else [], response)
+        return response
+
+    def _record_stream(self, contents, generation_config, response):
+        pieces = []
+        for chunk in response:
+            if chunk.text:
+                pieces.append(chunk.text)
+            yield chunk
+        self._save(contents, generation_config, pieces, response)
+
+    def _save(self, contents, generation_config, pieces, response):
+        usage = getattr(response, "usage_metadata", None)
+        record = {
+            "key": request_key(contents, generation_config),
+            "pieces": pieces,
+            "prompt_token_count": getattr(usage, "prompt_token_count", 0) if usage else 0,
+            "candidates_token_count": getattr(usage, "candidates_token_count", 0) if usage else 0,
+        }
+        with self._lock:
+            with open(self.cassette_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+
+
+class ReplayModel:
+    """
+    Offline Gemini stand-in that answers from a recorded cassette (or a FakeGeminiModel
+    when a request wasn't recorded), with configurable latency, streaming speed and
+    injected failures. Safe to share between threads.
+    """
+    def __init__(self, cassette_path=None, latency=0.0, jitter=0.0, piece_delay=0.0,
+                 error_rate=0.0, quota_error_rate=0.0, fallback=True, seed=None):
+        self.latency = latency # Seconds before the first byte
+        self.jitter = jitter # Extra random latency, uniform in [0, jitter]
+        self.piece_delay = piece_delay # Seconds between streamed pieces
+        self.error_rate = error_rate # Share of calls failing with a generic 503
+        self.quota_error_rate = quota_error_rate # Share of calls failing with a 429 quota error
+        self.fallback = FakeGeminiModel() if fallback else None
+        self.recordings = {}
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._next_index = {}
+        if cassette_path and os.path.exists(cassette_path):
+            with open(cassette_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.recordings.setdefault(record["key"], []).append(record)
+
+    def generate_content(self, contents, generation_config=None, stream=False):
+        key = request_key(contents, generation_config)
+        with self._lock:
+            self.calls += 1
+            roll = self._random.random()
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            record = self._next_recording(key)
+
+        if roll < self.quota_error_rate:
+            time.sleep(delay)
+            raise QuotaExceededError()
+        if roll < self.quota_error_rate + self.error_rate:
+            time.sleep(delay)
+            raise InjectedBackendError()
+
+        if record is not None:
+            usage = FakeUsage(record["prompt_token_count"], record["candidates_token_count"])
+            response = FakeResponse(record["pieces"], self.piece_delay, usage)
+        elif self.fallback is not None:
+            response = self.fallback.generate_content(contents, generation_config=generation_config, stream=True)
+            response = FakeResponse(response.pieces, self.piece_delay, response.usage_metadata)
+        else:
+            raise LookupError(f"No recording for request {key[:12]} and no fallback configured.")
+
+        time.sleep(delay)
+        if not stream and self.piece_delay:
+            time.sleep(self.piece_delay * len(response.pieces)) # A blocking call waits for the whole answer
+        return response
+
+    def _next_recording(self, key):
+        # Repeated identical requests cycle through their recordings in order
+        records = self.recordings.get(key)
+        if not records:
+            return None
+        index = self._next_index.get(key, 0)
+        self._next_index[key] = index + 1
+        return records[index % len(records)]
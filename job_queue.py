@@ -0,0 +1,332 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from db_manager import DATABASE_NAME, record_token_usage
+from summary_pipeline import summarize_file, summarize_text
+from token_budget import MeteredModel
+
+# The job database lives next to users.db
+JOBS_DATABASE_NAME = os.path.join(os.path.dirname(DATABASE_NAME), 'jobs.db')
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+
+MAX_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 5 # Doubled after every failed attempt
+POLL_INTERVAL_SECONDS = 1.0
+LEASE_SECONDS = 120 # A running job whose owner stops renewing it for this long is claimable again
+LEASE_RENEW_SECONDS = 30
+STATUS_WRITE_RETRIES = 5 # Attempts at saving a finished job's outcome while the database is busy
+STATUS_WRITE_RETRY_SECONDS = 1.0 # Multiplied by the attempt number
+
+_JOB_COLUMNS = ("id", "username", "kind", "title", "payload", "priority", "status", "attempts",
+                "max_retries", "result", "error", "run_after", "created_at", "started_at", "finished_at",
+                "owner", "lease_until")
+
+
+class JobQueue:
+    """
+    A persistent summarization job queue stored in SQLite.
+    Several processes may share one database (the app and folder_watcher.py). Each claim is
+    a lease held by this queue's owner id and renewed by its workers; a running job is only
+    taken back when its lease has expired, i.e. its process stopped or crashed.
+    Every method opens its own connection, so one JobQueue can be shared by many worker threads.
+    """
+    def __init__(self, database=JOBS_DATABASE_NAME, owner=None):
+        self.database = database
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL") # Readers don't block the workers' writes
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_retries INTEGER NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    run_after REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    owner TEXT,
+                    lease_until REAL
+                )
+            ''')
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column in ("owner TEXT", "lease_until REAL"): # Databases created before leases
+                if column.split()[0] not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_pending ON jobs (status, priority DESC, id)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        # isolation_level=None: transactions are opened explicitly where they matter
+        return sqlite3.connect(self.database, timeout=30, isolation_level=None)
+
+    def enqueue(self, username, payload, title="", kind="summarize", priority=0, max_retries=MAX_RETRIES):
+        """Adds a job and returns its id. Higher priority jobs are claimed first."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "INSERT INTO jobs (username, kind, title, payload, priority, status, max_retries, run_after, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (username, kind, title, json.dumps(payload), priority, STATUS_QUEUED, max_retries, now, now))
+            return cursor.lastrowid
+        finally:
+            conn.close()
+
+    def claim(self, username=None):
+        """
+        Atomically takes the next runnable job (optionally only for one user), marks it running
+        and leases it to this queue's owner. Running jobs whose lease expired are taken over.
+        Returns the job as a dict, or None if nothing is ready.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE") # Take the write lock first so two workers can't claim the same job
+            query = (f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE ((status = ? AND run_after <= ?) "
+                     "OR (status = ? AND COALESCE(lease_until, 0) < ?))")
+            params = [STATUS_QUEUED, now, STATUS_RUNNING, now]
+            if username is not None:
+                query += " AND username = ?"
+                params.append(username)
+            row = conn.execute(query + " ORDER BY priority DESC, id LIMIT 1", params).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute("UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, owner = ?, lease_until = ? "
+                         "WHERE id = ?", (STATUS_RUNNING, now, self.owner, now + LEASE_SECONDS, row[0]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        job = self._row_to_job(row)
+        job["status"] = STATUS_RUNNING
+        job["attempts"] += 1
+        job["owner"] = self.owner
+        job["lease_until"] = now + LEASE_SECONDS
+        return job
+
+    def renew_leases(self):
+        """Extends the lease of every job this owner is running. Returns how many."""
+        conn = self._connect()
+        try:
+            cursor = conn.execute("UPDATE jobs SET lease_until = ? WHERE owner = ? AND status = ?",
+                                  (time.time() + LEASE_SECONDS, self.owner, STATUS_RUNNING))
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def complete(self, job_id, result):
+        """Stores the result. Ignored (returns False) if the job's lease was lost to another owner."""
+        return self._update_owned(job_id, status=STATUS_DONE, result=result, error=None, finished_at=time.time())
+
+    def fail(self, job_id, error):
+        """Records a failed attempt: the job is retried with backoff until max_retries is used up."""
+        job = self.get_job(job_id)
+        if job is None:
+            return False
+        if job["attempts"] <= job["max_retries"]:
+            delay = RETRY_BACKOFF_SECONDS * (2 ** (job["attempts"] - 1))
+            return self._update_owned(job_id, status=STATUS_QUEUED, error=error, run_after=time.time() + delay)
+        return self._update_owned(job_id, status=STATUS_FAILED, error=error, finished_at=time.time())
+
+    def cancel(self, job_id):
+        """Cancels a job that hasn't started yet. Returns True if it was cancelled."""
+        conn = self._connect()
+        try:
+            cursor = conn.execute("UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+                                  (STATUS_CANCELLED, time.time(), job_id, STATUS_QUEUED))
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def recover_interrupted(self):
+        """
+        Puts running jobs whose lease expired (their process exited or crashed) back in the queue.
+        Jobs another live process is running keep their lease. Returns how many were recovered.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.execute("UPDATE jobs SET status = ?, run_after = ?, owner = NULL, lease_until = NULL "
+                                  "WHERE status = ? AND COALESCE(lease_until, 0) < ?",
+                                  (STATUS_QUEUED, now, STATUS_RUNNING, now))
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def get_job(self, job_id):
+        conn = self._connect()
+        try:
+            row = conn.execute(f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        return self._row_to_job(row) if row else None
+
+    def list_jobs(self, username, limit=200):
+        """Most recent jobs of one user, newest first."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE username = ? ORDER BY id DESC LIMIT ?",
+                                (username, limit)).fetchall()
+        finally:
+            conn.close()
+        return [self._row_to_job(row) for row in rows]
+
+    def statuses(self, job_ids):
+        """Status of each of job_ids that still exists, as {job_id: status}."""
+        job_ids = list(job_ids)
+        if not job_ids:
+            return {}
+        conn = self._connect()
+        try:
+            placeholders = ",".join("?" * len(job_ids))
+            rows = conn.execute(f"SELECT id, status FROM jobs WHERE id IN ({placeholders})", job_ids).fetchall()
+        finally:
+            conn.close()
+        return dict(rows)
+
+    def count_by_status(self, username):
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs WHERE username = ? GROUP BY status",
+                                (username,)).fetchall()
+        finally:
+            conn.close()
+        return dict(rows)
+
+    def _update_owned(self, job_id, **fields):
+        # Only while this owner still holds the job; after a lost lease the new owner's outcome counts
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        conn = self._connect()
+        try:
+            cursor = conn.execute(f"UPDATE jobs SET {assignments}, owner = NULL, lease_until = NULL "
+                                  "WHERE id = ? AND owner = ? AND status = ?",
+                                  (*fields.values(), job_id, self.owner, STATUS_RUNNING))
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_job(row):
+        job = dict(zip(_JOB_COLUMNS, row))
+        job["payload"] = json.loads(job["payload"])
+        return job
+
+
+class JobWorkerPool:
+    """
+    Background threads that claim jobs from a JobQueue and run them through handler(job) -> result text.
+    Summaries are network-bound, so throughput grows with worker_count. A heartbeat thread renews
+    the leases of the running jobs so other processes sharing the database leave them alone.
+    """
+    def __init__(self, queue, handler, worker_count=2, username=None, poll_interval=POLL_INTERVAL_SECONDS):
+        self.queue = queue
+        self.handler = handler
+        self.worker_count = worker_count
+        self.username = username # Only this user's jobs are claimed (None = everyone's)
+        self.poll_interval = poll_interval
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    def start(self):
+        if self.is_running():
+            return
+        self._stop_event.clear()
+        workers = [threading.Thread(target=self._run, name=f"job-worker-{i + 1}", daemon=True)
+                   for i in range(self.worker_count)]
+        heartbeat = threading.Thread(target=self._renew_leases, args=(workers,), name="job-lease-heartbeat", daemon=True)
+        self._threads = workers + [heartbeat]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, wait=True):
+        """
+        Stops claiming new jobs. Jobs already running finish first when wait is True; otherwise
+        their leases run out and another worker (or the next start) picks them up again.
+        """
+        self._stop_event.set()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        self._threads = []
+
+    def is_running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                job = self.queue.claim(self.username)
+            except sqlite3.OperationalError:
+                job = None # Database busy; try again on the next poll
+            if job is None:
+                self._stop_event.wait(self.poll_interval)
+                continue
+            try:
+                result = self.handler(job)
+            except Exception as e:
+                self._save_outcome(self.queue.fail, job["id"], str(e))
+            else:
+                self._save_outcome(self.queue.complete, job["id"], result)
+
+    def _save_outcome(self, write, job_id, value):
+        # A locked database must not kill the worker thread or lose a finished summary
+        for attempt in range(1, STATUS_WRITE_RETRIES + 1):
+            try:
+                write(job_id, value)
+                return
+            except sqlite3.OperationalError as e:
+                print(f"Job #{job_id}: could not save its outcome (attempt {attempt}/{STATUS_WRITE_RETRIES}): {e}")
+                if attempt < STATUS_WRITE_RETRIES:
+                    time.sleep(STATUS_WRITE_RETRY_SECONDS * attempt)
+        print(f"Job #{job_id}: giving up on saving its outcome; it runs again once its lease expires")
+
+    def _renew_leases(self, workers):
+        # Keeps beating until the last worker is done, so a job finishing after stop() keeps its lease
+        while not self._stop_event.is_set() or any(thread.is_alive() for thread in workers):
+            try:
+                self.queue.renew_leases()
+            except sqlite3.OperationalError:
+                pass # Database busy; the lease has plenty of slack until the next beat
+            if not self._stop_event.is_set():
+                self._stop_event.wait(LEASE_RENEW_SECONDS)
+                continue
+            running = [thread for thread in workers if thread.is_alive()]
+            if running:
+                running[0].join(LEASE_RENEW_SECONDS) # Wakes early when that worker finishes
+
+
+def run_summary_job(model_factory, job):
+    """Job handler for "summarize" jobs: payload holds either {"text": ...} or {"file_path": ...}."""
+    model = MeteredModel(model_factory())
+    payload = job["payload"]
+    try:
+        if "file_path" in payload:
+            return summarize_file(model, payload["file_path"])
+        return summarize_text(model, payload["text"])
+    finally:
+        record_token_usage(job["username"], model.input_tokens, model.output_tokens)
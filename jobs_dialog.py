@@ -0,0 +1,102 @@
+import time
+
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QListWidget, QListWidgetItem,
+                             QPushButton, QMessageBox)
+from PyQt5.QtGui import QFont
+from PyQt5.QtCore import Qt, QTimer
+
+from job_queue import STATUS_DONE, STATUS_FAILED, STATUS_QUEUED
+from ui_styles import AppStyles
+
+REFRESH_INTERVAL_MS = 2000
+
+_STATUS_ICONS = {
+    "queued": "⏳",
+    "running": "⚙️",
+    "done": "✅",
+    "failed": "❌",
+    "cancelled": "🚫",
+}
+
+
+class JobsDialog(QDialog):
+    """
+    Lists the current user's background summarization jobs.
+    A finished job's summary can be opened in the main window.
+    """
+    def __init__(self, job_queue, username, is_dark_theme, on_open_result, parent=None):
+        super().__init__(parent)
+        self.job_queue = job_queue
+        self.username = username
+        self.on_open_result = on_open_result # Called with (title, summary) when a result is opened
+        self.setWindowTitle("🗂️ Summary Jobs")
+        self.resize(600, 420)
+
+        layout = QVBoxLayout()
+        layout.setSpacing(10)
+
+        self.job_list = QListWidget(self)
+        self.job_list.setFont(QFont("Segoe UI", 11))
+        self.job_list.itemDoubleClicked.connect(self.open_result)
+        layout.addWidget(self.job_list)
+
+        buttons_layout = QHBoxLayout()
+        self.open_button = QPushButton("📄 Open Result", self)
+        self.open_button.clicked.connect(self.open_result)
+        self.cancel_button = QPushButton("🚫 Cancel Job", self)
+        self.cancel_button.clicked.connect(self.cancel_job)
+        self.close_button = QPushButton("Close", self)
+        self.close_button.clicked.connect(self.accept)
+        for button in (self.open_button, self.cancel_button, self.close_button):
+            button.setMinimumHeight(40)
+            button.setFont(QFont("Segoe UI", 10, QFont.Bold))
+            button.setStyleSheet(AppStyles.get_secondary_button_style(is_dark_theme))
+            buttons_layout.addWidget(button)
+        layout.addLayout(buttons_layout)
+
+        self.setLayout(layout)
+        self.setStyleSheet(AppStyles.get_main_style(is_dark_theme))
+        self.job_list.setStyleSheet(AppStyles.get_input_style(is_dark_theme))
+
+        # Keep statuses fresh while workers run in the background
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(REFRESH_INTERVAL_MS)
+        self.refresh()
+
+    def refresh(self):
+        selected_id = self._selected_job_id()
+        self.job_list.clear()
+        for job in self.job_queue.list_jobs(self.username):
+            created = time.strftime("%Y-%m-%d %H:%M", time.localtime(job["created_at"]))
+            text = f"{_STATUS_ICONS.get(job['status'], '')} #{job['id']}  {job['title']}  ({job['status']}, {created})"
+            if job["status"] == STATUS_FAILED and job["error"]:
+                text += f"\n    Error: {job['error'][:120]}"
+            item = QListWidgetItem(text)
+            item.setData(Qt.UserRole, job["id"])
+            self.job_list.addItem(item)
+            if job["id"] == selected_id:
+                self.job_list.setCurrentItem(item)
+
+    def _selected_job_id(self):
+        item = self.job_list.currentItem()
+        return item.data(Qt.UserRole) if item else None
+
+    def open_result(self):
+        job_id = self._selected_job_id()
+        if job_id is None:
+            return
+        job = self.job_queue.get_job(job_id)
+        if job is None or job["status"] != STATUS_DONE:
+            QMessageBox.information(self, "Job Not Finished", "This job has no summary yet.")
+            return
+        self.on_open_result(job["title"], job["result"] or "")
+        self.accept()
+
+    def cancel_job(self):
+        job_id = self._selected_job_id()
+        if job_id is None:
+            return
+        if not self.job_queue.cancel(job_id):
+            QMessageBox.warning(self, "Cancel Failed", f"Only jobs that are still {STATUS_QUEUED} can be cancelled.")
+        self.refresh()
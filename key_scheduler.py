@@ -0,0 +1,263 @@
+import math
+import threading
+import time
+from collections import deque
+
+from gemini_backend import DEFAULT_MODEL_NAME, create_model_for_key, close_model_for_key
+from token_budget import estimate_tokens, IMAGE_TOKENS, MAX_OUTPUT_TOKENS
+
+# Per-key Gemini limits (free tier defaults for 1.5 Flash); raise them for paid keys
+KEY_RPM_LIMIT = 15
+KEY_TPM_LIMIT = 1000000
+RATE_WINDOW_SECONDS = 60.0
+QUOTA_COOLDOWN_SECONDS = 60.0 # Doubled for every further quota error in a row
+MAX_COOLDOWN_SECONDS = 15 * 60
+MAX_KEY_WAIT_SECONDS = 30.0 # How long a request waits for a key with headroom before giving up
+
+
+def parse_api_keys(text):
+    """Splits a comma/whitespace separated list of keys, dropping blanks and duplicates."""
+    keys = []
+    for key in text.replace(",", " ").split():
+        if key not in keys:
+            keys.append(key)
+    return keys
+
+
+def is_quota_error(error):
+    message = str(error).lower()
+    return "quota" in message or "429" in message or "resource has been exhausted" in message
+
+
+class KeysExhaustedError(Exception):
+    """
+    No key had headroom in time. retry_after is the number of seconds until one should have.
+    The message mentions quota so existing quota handling applies.
+    """
+    def __init__(self, retry_after=None):
+        self.retry_after = retry_after
+        if retry_after is None:
+            message = "429 All configured API keys are over their quota or rate limit. Try again shortly."
+        else:
+            message = (f"429 Rate limited, retry in {max(1, math.ceil(retry_after))} s: "
+                       "every configured API key is at its quota or rate limit.")
+        super().__init__(message)
+
+
+class Reservation:
+    """One request's token entry in its key's window; release() corrects it in place."""
+    __slots__ = ("key", "started", "tokens", "in_window")
+
+    def __init__(self, key, started, tokens):
+        self.key = key
+        self.started = started
+        self.tokens = tokens
+        self.in_window = True # False once the entry has aged out of the window
+
+
+class KeyState:
+    """Sliding-window request and token counts for one key, plus its quota cooldown."""
+    __slots__ = ("key", "requests", "tokens", "token_total", "cooldown_until", "quota_errors", "in_flight")
+
+    def __init__(self, key):
+        self.key = key
+        self.requests = deque() # Request start times in the window
+        self.tokens = deque() # Reservations in the window
+        self.token_total = 0
+        self.cooldown_until = 0.0
+        self.quota_errors = 0 # Consecutive quota errors
+        self.in_flight = 0
+
+    def prune(self, now):
+        cutoff = now - RATE_WINDOW_SECONDS
+        while self.requests and self.requests[0] <= cutoff:
+            self.requests.popleft()
+        while self.tokens and self.tokens[0].started <= cutoff:
+            reservation = self.tokens.popleft()
+            reservation.in_window = False
+            self.token_total -= reservation.tokens
+
+
+class KeyScheduler:
+    """
+    Routes requests over a pool of API keys. Each key has sliding-window request and token
+    counters; acquire() picks the key with the most headroom against its limits and blocks
+    (up to a timeout) when every key is saturated or cooling down after a quota error.
+    It also owns one model (one client connection) per key, shared by every ScheduledModel.
+    Safe to share between threads.
+    """
+    def __init__(self, keys, rpm_limit=KEY_RPM_LIMIT, tpm_limit=KEY_TPM_LIMIT, model_for_key=create_model_for_key):
+        if not keys:
+            raise ValueError("KeyScheduler needs at least one API key.")
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+        self.states = {key: KeyState(key) for key in keys}
+        self.model_for_key = model_for_key
+        self._models = {} # (key, model name) -> model
+        self._models_lock = threading.Lock()
+        self._condition = threading.Condition()
+
+    @property
+    def keys(self):
+        return list(self.states)
+
+    def model(self, key, model_name=DEFAULT_MODEL_NAME):
+        """The cached model for key, created on first use."""
+        with self._models_lock:
+            model = self._models.get((key, model_name))
+            if model is None:
+                model = self._models[(key, model_name)] = self.model_for_key(key, model_name)
+            return model
+
+    def close(self):
+        """Closes every cached model's client. Call when the scheduler is replaced or the app exits."""
+        with self._models_lock:
+            models, self._models = list(self._models.values()), {}
+        for model in models:
+            close_model_for_key(model)
+
+    def acquire(self, estimated_tokens, timeout=MAX_KEY_WAIT_SECONDS):
+        """
+        Reserves one request and estimated_tokens on the key with the most headroom.
+        Returns a Reservation (its .key is the key to use); pass it back to release().
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                best, best_headroom, next_free = None, None, None
+                for state in self.states.values():
+                    state.prune(now)
+                    headroom, free_at = self._headroom(state, estimated_tokens, now)
+                    if headroom is None:
+                        if next_free is None or free_at < next_free:
+                            next_free = free_at
+                    elif best is None or headroom > best_headroom:
+                        best, best_headroom = state, headroom
+                if best is not None:
+                    reservation = Reservation(best.key, now, estimated_tokens)
+                    best.requests.append(now)
+                    best.tokens.append(reservation)
+                    best.token_total += estimated_tokens
+                    best.in_flight += 1
+                    return reservation
+
+                remaining = deadline - now
+                if remaining <= 0:
+                    raise KeysExhaustedError(None if next_free is None else next_free - now)
+                wait = remaining if next_free is None else min(remaining, max(next_free - now, 0.01))
+                self._condition.wait(wait)
+
+    def _headroom(self, state, estimated_tokens, now):
+        """
+        (share of the tighter limit left after this request, None) when the key can take it,
+        otherwise (None, time the key should free up).
+        """
+        if state.cooldown_until > now:
+            return None, state.cooldown_until
+        request_room = 1.0 - (len(state.requests) + 1) / self.rpm_limit
+        # A single request larger than the whole TPM limit is still allowed on an idle key
+        tokens = min(estimated_tokens, self.tpm_limit)
+        token_room = 1.0 - (state.token_total + tokens) / self.tpm_limit
+        if request_room >= 0 and token_room >= 0:
+            return min(request_room, token_room), None
+        oldest = [entries[0] for entries in (state.requests, [r.started for r in state.tokens]) if entries]
+        return None, (min(oldest) + RATE_WINDOW_SECONDS) if oldest else now
+
+    def release(self, reservation, actual_tokens=None, quota_error=False):
+        """
+        Ends a request: replaces the reservation's token estimate with the actual count when
+        known, and on a quota error puts the key on an exponentially growing cooldown.
+        """
+        with self._condition:
+            state = self.states[reservation.key]
+            state.in_flight = max(0, state.in_flight - 1)
+            if actual_tokens is not None and reservation.in_window:
+                # Corrected in place, so the entry still leaves the window at its original time
+                state.token_total += actual_tokens - reservation.tokens
+                reservation.tokens = actual_tokens
+            if quota_error:
+                state.quota_errors += 1
+                cooldown = min(QUOTA_COOLDOWN_SECONDS * 2 ** (state.quota_errors - 1), MAX_COOLDOWN_SECONDS)
+                state.cooldown_until = time.monotonic() + cooldown
+            else:
+                state.quota_errors = 0
+            self._condition.notify_all()
+
+    def status(self):
+        """One line per key (masked) with its current window usage and cooldown."""
+        now = time.monotonic()
+        lines = []
+        with self._condition:
+            for state in self.states.values():
+                state.prune(now)
+                line = (f"{mask_key(state.key)}: {len(state.requests)}/{self.rpm_limit} req/min, "
+                        f"{state.token_total:,}/{self.tpm_limit:,} tokens/min")
+                if state.cooldown_until > now:
+                    line += f", cooling down {state.cooldown_until - now:.0f} s"
+                lines.append(line)
+        return "\n".join(lines)
+
+
+def mask_key(key):
+    return key[:4] + "…" + key[-4:] if len(key) > 12 else "key…"
+
+
+class ScheduledModel:
+    """
+    A model that sends every generate_content call through a KeyScheduler, using the
+    scheduler's client for the chosen key. Quota errors cool the key down and the call is
+    retried on another key, once per configured key. Cheap to create per request.
+    Calls made on fail_fast_thread (the GUI thread) never wait for a key: they raise
+    KeysExhaustedError with the time to retry instead of freezing the window.
+    """
+    def __init__(self, scheduler, model_name=DEFAULT_MODEL_NAME, fail_fast_thread=None):
+        self.scheduler = scheduler
+        self.model_name = model_name
+        self.fail_fast_thread = fail_fast_thread
+
+    def generate_content(self, contents, generation_config=None, stream=False):
+        estimated = _estimate_request_tokens(contents, generation_config)
+        timeout = 0 if threading.current_thread() is self.fail_fast_thread else MAX_KEY_WAIT_SECONDS
+        last_error = None
+        for _ in range(len(self.scheduler.states)):
+            reservation = self.scheduler.acquire(estimated, timeout)
+            try:
+                model = self.scheduler.model(reservation.key, self.model_name)
+                response = model.generate_content(contents, generation_config=generation_config, stream=stream)
+                if stream:
+                    return self._released_stream(reservation, response)
+            except Exception as e:
+                self.scheduler.release(reservation, 0, quota_error=is_quota_error(e)) # Failed calls use no tokens
+                if not is_quota_error(e):
+                    raise
+                last_error = e
+                continue
+            self.scheduler.release(reservation, _usage_tokens(response))
+            return response
+        raise last_error
+
+    def _released_stream(self, reservation, response):
+        quota_error = False
+        try:
+            for chunk in response:
+                yield chunk
+        except Exception as e:
+            quota_error = is_quota_error(e)
+            raise
+        finally:
+            self.scheduler.release(reservation, _usage_tokens(response), quota_error=quota_error)
+
+
+def _estimate_request_tokens(contents, generation_config):
+    input_tokens = sum(estimate_tokens(part) if isinstance(part, str) else IMAGE_TOKENS for part in contents)
+    max_output = (generation_config or {}).get("max_output_tokens", MAX_OUTPUT_TOKENS)
+    return input_tokens + max_output
+
+
+def _usage_tokens(response):
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return None
+    total = getattr(usage, "prompt_token_count", 0) + getattr(usage, "candidates_token_count", 0)
+    return total or None
@@ -0,0 +1,134 @@
+import argparse
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from document_extractor import extract_document
+from memory_budget import memory_report
+from gemini_backend import ReplayModel, QuotaExceededError, set_backend_factory, create_model
+from summary_pipeline import summarize_text
+from token_budget import MeteredModel, plan_text_summary
+from key_scheduler import KeyScheduler, ScheduledModel, KEY_RPM_LIMIT
+
+SAMPLE_TEXT = ("Keypoint AI turns long notes into short summaries. " * 40).strip()
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class LoadTestResult:
+    def __init__(self):
+        self.latencies = []
+        self.quota_errors = 0
+        self.other_errors = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, latency, error=None, model=None):
+        with self._lock:
+            if error is None:
+                self.latencies.append(latency)
+            elif isinstance(error, QuotaExceededError) or "quota" in str(error).lower():
+                self.quota_errors += 1
+            else:
+                self.other_errors += 1
+            if model is not None:
+                self.input_tokens += model.input_tokens
+                self.output_tokens += model.output_tokens
+
+    def report(self):
+        latencies = sorted(self.latencies)
+        total = len(latencies) + self.quota_errors + self.other_errors
+        throughput = len(latencies) / self.elapsed if self.elapsed else 0.0
+        return "\n".join([
+            f"Requests:      {total} ({len(latencies)} ok, {self.quota_errors} quota errors, {self.other_errors} other errors)",
+            f"Elapsed:       {self.elapsed:.2f} s",
+            f"Throughput:    {throughput:.2f} summaries/s",
+            f"Latency p50:   {percentile(latencies, 50) * 1000:.1f} ms",
+            f"Latency p95:   {percentile(latencies, 95) * 1000:.1f} ms",
+            f"Latency p99:   {percentile(latencies, 99) * 1000:.1f} ms",
+            f"Tokens:        {self.input_tokens:,} in / {self.output_tokens:,} out",
+        ])
+
+
+def run_session(requests, file_path, result, model_factory=create_model):
+    """One simulated user: extract (if a file is given), plan and summarize, `requests` times."""
+    for _ in range(requests):
+        model = MeteredModel(model_factory())
+        start = time.perf_counter()
+        try:
+            with memory_report.track("extract"):
+                text = extract_document(file_path).text if file_path else SAMPLE_TEXT
+            with memory_report.track("summarize"):
+                summarize_text(model, text, plan=plan_text_summary(text))
+        except Exception as e:
+            result.add(time.perf_counter() - start, e, model)
+        else:
+            result.add(time.perf_counter() - start, model=model)
+
+
+def run_load_test(sessions, requests, file_path=None, model_factory=create_model):
+    """Runs `sessions` concurrent sessions against whatever backend model_factory() returns."""
+    result = LoadTestResult()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        futures = [executor.submit(run_session, requests, file_path, result, model_factory) for _ in range(sessions)]
+        for future in futures:
+            future.result()
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def shared_backend(model, model_name):
+    """Backend factory that hands every create_model() call the same replay model."""
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the summarization pipeline against a replayed Gemini backend.")
+    parser.add_argument("--sessions", type=int, default=20, help="Concurrent simulated users.")
+    parser.add_argument("--requests", type=int, default=5, help="Summaries per session.")
+    parser.add_argument("--file", help="Document to extract and summarize (default: built-in sample text).")
+    parser.add_argument("--cassette", help="JSONL recording from a record:<file> backend; unmatched requests use the fake model.")
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds before the first byte.")
+    parser.add_argument("--jitter", type=float, default=0.3, help="Extra random latency in seconds.")
+    parser.add_argument("--piece-delay", type=float, default=0.0, help="Seconds between streamed pieces.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls failing with a 503.")
+    parser.add_argument("--quota-error-rate", type=float, default=0.0, help="Share of calls failing with a 429.")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--keys", type=int, default=0,
+                        help="Simulate this many API keys behind the key scheduler (0 = no scheduler).")
+    parser.add_argument("--key-rpm", type=int, default=KEY_RPM_LIMIT, help="Requests per minute allowed per simulated key.")
+    parser.add_argument("--memory", action="store_true", help="Report the peak memory of each stage (slower; with several sessions, peaks include overlapping sessions).")
+    args = parser.parse_args()
+
+    replay = ReplayModel(args.cassette, latency=args.latency, jitter=args.jitter, piece_delay=args.piece_delay,
+                         error_rate=args.error_rate, quota_error_rate=args.quota_error_rate, seed=args.seed)
+    set_backend_factory(partial(shared_backend, replay))
+    if args.memory:
+        memory_report.enable()
+
+    model_factory = create_model
+    if args.keys:
+        scheduler = KeyScheduler([f"simulated-key-{i + 1}" for i in range(args.keys)], rpm_limit=args.key_rpm)
+        model_factory = partial(ScheduledModel, scheduler)
+
+    result = run_load_test(args.sessions, args.requests, args.file, model_factory)
+    print(result.report())
+    if args.keys:
+        print(scheduler.status())
+    if args.memory:
+        print(memory_report.report())
+
+
+if __name__ == '__main__':
+    main()
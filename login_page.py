@@ -150,15 +150,16 @@ class LoginPage(QWidget):
 
         if user:
             self.stacked_widget.setCurrentIndex(1) # Go to loading page
-            QTimer.singleShot(1500, lambda: self.finish_authentication(self.is_dark_theme))
+            QTimer.singleShot(1500, lambda: self.finish_authentication(self.is_dark_theme, username))
         else:
             QMessageBox.warning(self, "Login Failed", "Invalid username or password.")
 
-    def finish_authentication(self, theme_state):
+    def finish_authentication(self, theme_state, username):
         # Access the AINoteSummarizer page and set its theme
         ainote_summarizer_page = self.stacked_widget.widget(2)
         ainote_summarizer_page.is_dark_theme = theme_state
         ainote_summarizer_page.apply_theme_styles() # Apply theme based on login page's state
+        ainote_summarizer_page.set_user(username) # Resumes this user's background summary jobs
 
         self.stacked_widget.setCurrentIndex(2) # Go to AINoteSummarizer Page
 
@@ -0,0 +1,87 @@
+import os
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+MEMORY_REPORT_ENV_VAR = "KEYPOINT_MEMORY_REPORT" # Set to 1 to print per-stage peak memory
+MEMORY_BUDGET_MB = int(os.environ.get("KEYPOINT_MEMORY_BUDGET_MB", "512"))
+MEMORY_BUDGET_BYTES = MEMORY_BUDGET_MB * 1024 * 1024
+TRACEMALLOC_FRAMES = 1
+
+# Size thresholds scale with the budget; the comments give their value at the default 512 MB.
+# A QTextEdit needs hundreds of bytes per character once laid out, hence the small editor share.
+EDITOR_CHAR_BUDGET = MEMORY_BUDGET_BYTES // 512 # ~1M: larger documents only get a preview in the editor, and larger TXT/RTF files are streamed
+PREVIEW_CHARS = EDITOR_CHAR_BUDGET // 50 # ~20K characters of a large document shown in the editor
+STREAM_CHUNK_BYTES = MEMORY_BUDGET_BYTES // 1024 # 512 KB decoded at a time from a streamed file
+STREAM_FULL_LIMIT_BYTES = MEMORY_BUDGET_BYTES // 32 # 16 MB: larger streamed files are sampled instead of sent in full
+SAMPLE_BUDGET_BYTES = MEMORY_BUDGET_BYTES // 64 # 8 MB read from a sampled file
+
+
+class MemoryReport:
+    """
+    Records the tracemalloc peak of each pipeline stage (extract, display, summarize...).
+    Tracing costs CPU, so it only runs when enabled (see MEMORY_REPORT_ENV_VAR).
+    Stages may overlap (load-test sessions, job workers); an overlapping stage's peak then
+    includes what the others allocated at the same time, since tracemalloc counts the whole process.
+    """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stages = {} # Stage name -> (peak bytes above the stage's starting point, calls)
+        self._active = {} # Token -> [stage, starting bytes, highest peak seen so far]
+        self._lock = threading.Lock() # Only held while peaks are folded in, never across a stage
+
+    def enable(self):
+        self.enabled = True
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+
+    @contextmanager
+    def track(self, stage):
+        """Context manager measuring the peak memory allocated while the block runs."""
+        if not self.enabled:
+            yield
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        token = object()
+        with self._lock:
+            current = self._fold_peak()
+            self._active[token] = [stage, current, current]
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._fold_peak()
+                stage, start, peak = self._active.pop(token)
+                previous_peak, calls = self.stages.get(stage, (0, 0))
+                self.stages[stage] = (max(previous_peak, peak - start), calls + 1)
+
+    def _fold_peak(self):
+        # tracemalloc has one global peak: hand it to every running stage, then start a new interval
+        current, peak = tracemalloc.get_traced_memory()
+        for entry in self._active.values():
+            entry[2] = max(entry[2], peak)
+        tracemalloc.reset_peak()
+        return current
+
+    def peak_bytes(self, stage):
+        return self.stages.get(stage, (0, 0))[0]
+
+    def over_budget(self):
+        """Stages whose peak went above MEMORY_BUDGET_MB."""
+        return [stage for stage, (peak, _) in self.stages.items() if peak > MEMORY_BUDGET_BYTES]
+
+    def report(self):
+        if not self.stages:
+            return "No memory stages recorded."
+        lines = [f"Peak memory per stage (budget {MEMORY_BUDGET_MB} MB):"]
+        for stage, (peak, calls) in self.stages.items():
+            flag = "  <-- over budget" if peak > MEMORY_BUDGET_BYTES else ""
+            lines.append(f"- {stage}: {peak / (1024 * 1024):.1f} MB over {calls} run(s){flag}")
+        return "\n".join(lines)
+
+
+# Shared by the GUI, job workers and tools
+memory_report = MemoryReport()
+if os.environ.get(MEMORY_REPORT_ENV_VAR) == "1":
+    memory_report.enable()
@@ -0,0 +1,255 @@
+import difflib
+import hashlib
+import os
+import re
+import sqlite3
+import time
+import zlib
+
+import numpy as np # For vectorized MinHash
+
+from db_manager import DATABASE_NAME
+
+# The summary index lives next to users.db
+INDEX_DATABASE_NAME = os.path.join(os.path.dirname(DATABASE_NAME), 'summaries.db')
+
+# MinHash parameters. Stored signatures and buckets depend on these; bump INDEX_VERSION when
+# changing them and they are recomputed from the stored texts on the next start.
+SHINGLE_WORDS = 5 # Word n-grams compared between documents
+NUM_PERMUTATIONS = 128
+# 32 bands of 4 rows: a pair becomes a candidate with probability 1 - (1 - s^4)^32, which is
+# 50% at s ~ 0.42, 98.8% at 0.6 and above 99.99% at 0.7 and at NEAR_DUPLICATE_THRESHOLD.
+LSH_BANDS = 32
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+MINHASH_SEED = 20240601
+# PRAGMA user_version of an up-to-date index. Earlier files have 0 (16 bands) or 32 (32 bands),
+# both with signatures from the old, strongly correlated permutations.
+INDEX_VERSION = 3
+HASH_BATCH = 8192 # Shingles hashed per numpy batch, bounding the (permutations x batch) matrix
+
+NEAR_DUPLICATE_THRESHOLD = 0.8 # Estimated Jaccard similarity that counts as "the same document"
+MAX_DIFF_RATIO = 0.5 # A diff larger than this share of the new text isn't worth a diff-only update
+
+_rng = np.random.default_rng(MINHASH_SEED)
+# Multiply-shift hashing: (a * hash + b) mod 2**64 (numpy wraps), top 32 bits, with odd a.
+# Every bit of a and b must be random; small ones hardly reorder the shingles between permutations.
+_PERM_A = _rng.integers(0, 1 << 63, NUM_PERMUTATIONS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_PERM_B = _rng.integers(0, 1 << 63, NUM_PERMUTATIONS, dtype=np.uint64) * np.uint64(2)
+_SHIFT = np.uint64(32)
+_EMPTY = np.iinfo(np.uint64).max # Signature of a text without words
+_WORD = re.compile(r"\w+")
+_INSERT_BUCKETS = "INSERT INTO lsh_buckets (username, band, bucket, document_id) VALUES (?, ?, ?, ?)"
+
+
+def shingle_hashes(text):
+    """Stable 32-bit hashes of the document's distinct word n-grams."""
+    words = _WORD.findall(text.lower())
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    if len(words) < SHINGLE_WORDS:
+        shingles = [" ".join(words)]
+    else:
+        shingles = (" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1))
+    hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64)
+    return np.unique(hashes)
+
+
+def compute_signature(text):
+    """MinHash signature of a text: NUM_PERMUTATIONS uint64 minimums."""
+    signature = np.full(NUM_PERMUTATIONS, _EMPTY, dtype=np.uint64)
+    hashes = shingle_hashes(text)
+    for start in range(0, len(hashes), HASH_BATCH):
+        batch = hashes[start:start + HASH_BATCH]
+        permuted = (_PERM_A[:, None] * batch[None, :] + _PERM_B[:, None]) >> _SHIFT
+        np.minimum(signature, permuted.min(axis=1), out=signature)
+    return signature
+
+
+def estimate_similarity(signature, other):
+    """Estimated Jaccard similarity of the two documents' shingle sets."""
+    return float(np.count_nonzero(signature == other)) / NUM_PERMUTATIONS
+
+
+def band_buckets(signature):
+    """One bucket id per LSH band; documents sharing any bucket become candidates."""
+    buckets = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes()
+        buckets.append(int.from_bytes(hashlib.blake2b(rows, digest_size=8).digest(), "big", signed=True))
+    return buckets
+
+
+def describe_changes(old_text, new_text):
+    """
+    Line diff from old_text to new_text ("-" removed, "+" added), or None when the
+    documents differ too much for a diff-only summary update to make sense.
+    """
+    changes = [line for line in difflib.unified_diff(old_text.splitlines(), new_text.splitlines(), lineterm="", n=0)
+               if not line.startswith(("---", "+++", "@@"))]
+    changed_chars = sum(len(line) for line in changes)
+    if not changes or changed_chars > len(new_text) * MAX_DIFF_RATIO:
+        return None
+    return "\n".join(changes)
+
+
+def check_near_duplicate(index, username, text):
+    """
+    (signature, match, changes) for a newly extracted text: its MinHash signature, the best
+    earlier match from index.find_near_duplicate (or None) and describe_changes() against it.
+    Hashing and diffing take seconds on multi-megabyte texts, so call this off the GUI thread.
+    """
+    signature = compute_signature(text)
+    match = index.find_near_duplicate(username, text, signature)
+    changes = describe_changes(match["text"], text) if match else None
+    return signature, match, changes
+
+
+def check_document_near_duplicate(index, username, document):
+    """check_near_duplicate() for an extracted StructuredDocument, e.g. as the extraction worker's after_extract."""
+    return check_near_duplicate(index, username, document.text)
+
+
+def _bucket_rows(username, document_id, signature):
+    return [(username, band, bucket, document_id) for band, bucket in enumerate(band_buckets(signature))]
+
+
+class DuplicateIndex:
+    """
+    Summarized documents with their MinHash signatures, stored in SQLite. Each document
+    is filed under LSH_BANDS band buckets, so finding near-duplicates costs a handful of
+    indexed lookups instead of a scan over every stored document.
+    Every method opens its own connection, like JobQueue.
+    """
+    def __init__(self, database=INDEX_DATABASE_NAME):
+        self.database = database
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS documents (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    signature BLOB NOT NULL,
+                    text BLOB NOT NULL,
+                    summary TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(lsh_buckets)")}
+            outdated = bool(columns) and "username" not in columns
+            if outdated:
+                conn.execute("DROP TABLE lsh_buckets") # Buckets from before per-user lookups; rebuilt below
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS lsh_buckets (
+                    username TEXT NOT NULL,
+                    band INTEGER NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    document_id INTEGER NOT NULL
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_hash ON documents (username, text_hash)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_lsh_buckets_user ON lsh_buckets (username, band, bucket)")
+            conn.commit()
+            self._rebuild_if_needed(conn, outdated)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _rebuild_if_needed(conn, force=False):
+        # Recomputes every signature from its stored text and refiles it, for indexes from older versions
+        if conn.execute("PRAGMA user_version").fetchone()[0] == INDEX_VERSION and not force:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM lsh_buckets")
+            for document_id, username, stored_text in conn.execute("SELECT id, username, text FROM documents").fetchall():
+                signature = compute_signature(zlib.decompress(stored_text).decode("utf-8", "surrogatepass"))
+                conn.execute("UPDATE documents SET signature = ? WHERE id = ?", (signature.tobytes(), document_id))
+                conn.executemany(_INSERT_BUCKETS, _bucket_rows(username, document_id, signature))
+            conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def _connect(self):
+        return sqlite3.connect(self.database, timeout=30)
+
+    def add(self, username, title, text, summary, signature=None):
+        """Stores a summarized document (or refreshes the summary of an identical one). Returns its id."""
+        text_hash = hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT id FROM documents WHERE username = ? AND text_hash = ?",
+                               (username, text_hash)).fetchone()
+            if row:
+                conn.execute("UPDATE documents SET title = ?, summary = ?, created_at = ? WHERE id = ?",
+                             (title, summary, time.time(), row[0]))
+                conn.commit()
+                return row[0]
+            if signature is None:
+                signature = compute_signature(text)
+            cursor = conn.execute(
+                "INSERT INTO documents (username, title, text_hash, signature, text, summary, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (username, title, text_hash, signature.tobytes(), zlib.compress(text.encode("utf-8", "surrogatepass")),
+                 summary, time.time()))
+            document_id = cursor.lastrowid
+            conn.executemany(_INSERT_BUCKETS, _bucket_rows(username, document_id, signature))
+            conn.commit()
+            return document_id
+        finally:
+            conn.close()
+
+    def find_near_duplicate(self, username, text, signature=None, threshold=NEAR_DUPLICATE_THRESHOLD):
+        """
+        The most similar stored document of this user at or above threshold, as a dict with
+        id, title, similarity, summary and text. None when there isn't one.
+        """
+        if signature is None:
+            signature = compute_signature(text)
+        buckets = band_buckets(signature)
+        # The probe holds one (band, bucket) pair per band, so the bound variables never grow with
+        # the number of candidates; each pair is one lookup on idx_lsh_buckets_user
+        probe = ", ".join("(?, ?)" for _ in buckets)
+        params = [value for band_bucket in enumerate(buckets) for value in band_bucket] + [username]
+        conn = self._connect()
+        try:
+            best_id, best_similarity = None, threshold
+            for document_id, stored in conn.execute(
+                    f"WITH probe (band, bucket) AS (VALUES {probe}) "
+                    "SELECT id, signature FROM documents WHERE id IN ("
+                    "SELECT document_id FROM probe JOIN lsh_buckets USING (band, bucket) WHERE username = ?)",
+                    params):
+                similarity = estimate_similarity(signature, np.frombuffer(stored, dtype=np.uint64))
+                if similarity >= best_similarity:
+                    best_id, best_similarity = document_id, similarity
+            if best_id is None:
+                return None
+
+            title, stored_text, summary = conn.execute(
+                "SELECT title, text, summary FROM documents WHERE id = ?", (best_id,)).fetchone()
+            return {"id": best_id, "title": title, "similarity": best_similarity, "summary": summary,
+                    "text": zlib.decompress(stored_text).decode("utf-8", "surrogatepass")}
+        finally:
+            conn.close()
+
+    def remove(self, document_id):
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM lsh_buckets WHERE document_id = ?", (document_id,))
+            conn.execute("DELETE FROM documents WHERE id = ?", (document_id,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def count(self, username=None):
+        conn = self._connect()
+        try:
+            if username is None:
+                return conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM documents WHERE username = ?", (username,)).fetchone()[0]
+        finally:
+            conn.close()
@@ -0,0 +1,326 @@
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import uuid
+from collections import OrderedDict
+from functools import partial
+from urllib.parse import urlsplit, parse_qs
+
+from document_extractor import extract_document, get_file_extension, get_file_name, ExtractionError
+from summary_pipeline import stream_summary, summarize_text
+from gemini_backend import create_model, set_backend_factory, backend_factory_from_spec
+from key_scheduler import KeyScheduler, ScheduledModel, parse_api_keys
+
+# Constants for the local HTTP service
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 200 * 1024 * 1024 # Largest accepted upload
+MAX_HEADER_BYTES = 64 * 1024
+PER_CLIENT_CONCURRENCY = 2 # Requests one client may have in flight; more get 429
+MAX_CONCURRENT_JOBS = 8 # Extractions/summaries running at once; the rest wait their turn
+STREAM_QUEUE_SIZE = 8 # Streamed pieces buffered between the model thread and a slow client
+MAX_STORED_DOCUMENTS = 100 # Uploaded documents kept in memory (oldest dropped first)
+
+_REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            411: "Length Required", 413: "Payload Too Large", 422: "Unprocessable Entity",
+            429: "Too Many Requests", 500: "Internal Server Error", 502: "Bad Gateway"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class KeypointServer:
+    """
+    Local HTTP service exposing Keypoint's extraction and summarization to other tools.
+
+    Endpoints:
+        GET  /health
+        POST /documents?filename=notes.pdf   raw file body -> {"document_id", ...}
+        GET  /documents/<id>/text            extracted text
+        POST /extract?filename=notes.pdf     raw file body -> {"text", "blocks"}
+        POST /summarize[?stream=1]           {"text": ...} or {"document_id": ...}
+
+    Clients are identified by the X-Client-Id header (falling back to their address);
+    each may run PER_CLIENT_CONCURRENCY requests at once.
+    """
+    def __init__(self, model_factory, per_client_concurrency=PER_CLIENT_CONCURRENCY,
+                 max_concurrent_jobs=MAX_CONCURRENT_JOBS):
+        self.model_factory = model_factory # Returns an object with generate_content(), e.g. gemini_backend.create_model
+        self.per_client_concurrency = per_client_concurrency
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.documents = OrderedDict()
+        self._client_slots = {} # Client id -> requests currently in flight
+        self._job_slots = None # asyncio.Semaphore, created on the server's loop
+        self._server = None
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self._job_slots = asyncio.Semaphore(self.max_concurrent_jobs)
+        self._server = await asyncio.start_server(self._handle_connection, host, port, limit=MAX_HEADER_BYTES)
+        return self._server.sockets[0].getsockname()
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle_connection(self, reader, writer):
+        client_id = None
+        try:
+            method, target, headers = await self._read_head(reader)
+            client_id = headers.get("x-client-id") or str(writer.get_extra_info("peername", ("unknown",))[0])
+            # Checked before the body is read, so an over-limit client can't make us buffer its upload
+            if self._client_slots.get(client_id, 0) >= self.per_client_concurrency:
+                client_id = None # This request never took a slot
+                raise HttpError(429, f"Too many concurrent requests; at most {self.per_client_concurrency} per client.")
+            self._client_slots[client_id] = self._client_slots.get(client_id, 0) + 1
+            body = await self._read_body(reader, method, headers)
+            await self._dispatch(method, target, body, writer)
+        except HttpError as e:
+            await self._send_json(writer, e.status, {"error": e.message},
+                                  {"Retry-After": "1"} if e.status == 429 else None)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass # Client went away
+        except Exception as e:
+            await self._send_json(writer, 500, {"error": str(e)})
+        finally:
+            if client_id is not None:
+                self._client_slots[client_id] -= 1
+                if not self._client_slots[client_id]:
+                    del self._client_slots[client_id]
+            writer.close()
+
+    async def _read_head(self, reader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            raise HttpError(400, "Request headers too large.")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "Malformed request line.")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        return method, target, headers
+
+    async def _read_body(self, reader, method, headers):
+        if method not in ("POST", "PUT"):
+            return b""
+        if "content-length" not in headers:
+            raise HttpError(411, "Content-Length is required.")
+        length = headers["content-length"]
+        if not length.isdigit():
+            raise HttpError(400, f"Invalid Content-Length '{length}'.")
+        length = int(length)
+        if length > MAX_BODY_BYTES:
+            raise HttpError(413, f"Body larger than {MAX_BODY_BYTES} bytes.")
+        return await reader.readexactly(length)
+
+    async def _dispatch(self, method, target, body, writer):
+        url = urlsplit(target)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split("/") if part]
+
+        if parts == ["health"] and method == "GET":
+            await self._send_json(writer, 200, {"status": "ok", "documents": len(self.documents)})
+        elif parts == ["documents"] and method == "POST":
+            document = await self._extract_upload(query, body)
+            document_id = uuid.uuid4().hex
+            self.documents[document_id] = document
+            while len(self.documents) > MAX_STORED_DOCUMENTS:
+                self.documents.popitem(last=False)
+            await self._send_json(writer, 201, {"document_id": document_id, "characters": len(document),
+                                                "blocks": len(document.blocks)})
+        elif len(parts) == 3 and parts[0] == "documents" and parts[2] == "text" and method == "GET":
+            await self._send(writer, 200, self._get_document(parts[1]).text.encode("utf-8"), "text/plain; charset=utf-8")
+        elif parts == ["extract"] and method == "POST":
+            document = await self._extract_upload(query, body)
+            blocks = [{"kind": block.kind, "location": block.location, "start": block.start, "end": block.end}
+                      for block in document.blocks]
+            await self._send_json(writer, 200, {"text": document.text, "blocks": blocks})
+        elif parts == ["summarize"] and method == "POST":
+            await self._summarize(query, body, writer)
+        elif parts and parts[0] in ("health", "documents", "extract", "summarize"):
+            raise HttpError(405, f"{method} is not allowed on {url.path}.")
+        else:
+            raise HttpError(404, f"No such endpoint: {url.path}")
+
+    def _get_document(self, document_id):
+        document = self.documents.get(document_id)
+        if document is None:
+            raise HttpError(404, f"Unknown document '{document_id}'.")
+        self.documents.move_to_end(document_id)
+        return document
+
+    async def _extract_upload(self, query, body):
+        file_name = get_file_name(query.get("filename", ""))
+        if not file_name or "." not in file_name:
+            raise HttpError(400, "Pass the original file name, e.g. ?filename=notes.pdf")
+        if not body:
+            raise HttpError(400, "Empty upload.")
+        async with self._job_slots:
+            try:
+                return await asyncio.get_running_loop().run_in_executor(None, _extract_bytes, body, file_name)
+            except ExtractionError as e:
+                raise HttpError(422, f"{e.title}: {e.message}")
+
+    async def _summarize(self, query, body, writer):
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError: # JSONDecodeError, or bytes that aren't UTF-8
+            raise HttpError(400, "Body must be JSON: {\"text\": ...} or {\"document_id\": ...}")
+        if not isinstance(request, dict):
+            raise HttpError(400, "Body must be a JSON object: {\"text\": ...} or {\"document_id\": ...}")
+        if "document_id" in request:
+            if not isinstance(request["document_id"], str):
+                raise HttpError(400, "document_id must be a string.")
+            text = self._get_document(request["document_id"]).text
+        else:
+            text = request.get("text")
+            if not isinstance(text, str):
+                raise HttpError(400, "text must be a string.")
+            text = text.strip()
+        if not text:
+            raise HttpError(400, "Nothing to summarize.")
+        max_output_tokens = request.get("max_output_tokens")
+        if max_output_tokens is not None:
+            # bool is an int subclass; reject it along with floats and strings
+            if isinstance(max_output_tokens, bool) or not isinstance(max_output_tokens, int) or max_output_tokens <= 0:
+                raise HttpError(400, "max_output_tokens must be a positive integer.")
+
+        loop = asyncio.get_running_loop()
+        async with self._job_slots:
+            model = self.model_factory()
+            if query.get("stream") not in ("1", "true"):
+                try:
+                    summary = await loop.run_in_executor(None, summarize_text, model, text, max_output_tokens)
+                except Exception as e:
+                    raise HttpError(502, f"Summarization failed: {e}")
+                await self._send_json(writer, 200, {"summary": summary})
+                return
+            await self._stream_summary(loop, model, text, max_output_tokens, writer)
+
+    async def _stream_summary(self, loop, model, text, max_output_tokens, writer):
+        # The model streams on a worker thread; a bounded queue stops it from
+        # running ahead of a slow client (the thread blocks until the client drains)
+        pieces = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        done = object()
+        cancelled = False
+
+        def produce():
+            try:
+                for piece in stream_summary(model, text, max_output_tokens):
+                    if cancelled:
+                        return
+                    asyncio.run_coroutine_threadsafe(pieces.put(piece), loop).result()
+                asyncio.run_coroutine_threadsafe(pieces.put(done), loop).result()
+            except Exception as e:
+                asyncio.run_coroutine_threadsafe(pieces.put(e), loop).result()
+
+        producer = loop.run_in_executor(None, produce)
+        headers = ("HTTP/1.1 200 OK\r\nContent-Type: text/plain; charset=utf-8\r\n"
+                   "Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+        writer.write(headers.encode("latin-1"))
+        try:
+            while True:
+                piece = await pieces.get()
+                if piece is done:
+                    break
+                if isinstance(piece, Exception):
+                    # Headers are already sent, so the failure is reported in the body
+                    await self._write_chunk(writer, f"\n[error] Summarization failed: {piece}".encode("utf-8"))
+                    break
+                await self._write_chunk(writer, piece.encode("utf-8"))
+            await self._write_chunk(writer, b"")
+        finally:
+            cancelled = True
+            while not producer.done():
+                # Unblock a producer waiting on a full queue so its thread can exit
+                while not pieces.empty():
+                    pieces.get_nowait()
+                await asyncio.sleep(0.01)
+
+    @staticmethod
+    async def _write_chunk(writer, data):
+        writer.write(f"{len(data):X}\r\n".encode("latin-1") + data + b"\r\n")
+        await writer.drain() # Backpressure: wait while the client's socket buffer is full
+
+    async def _send_json(self, writer, status, payload, extra_headers=None):
+        await self._send(writer, status, json.dumps(payload).encode("utf-8"), "application/json", extra_headers)
+
+    @staticmethod
+    async def _send(writer, status, body, content_type, extra_headers=None):
+        headers = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+                   f"Content-Type: {content_type}",
+                   f"Content-Length: {len(body)}",
+                   "Connection: close"]
+        for name, value in (extra_headers or {}).items():
+            headers.append(f"{name}: {value}")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+
+def _extract_bytes(data, file_name):
+    """Writes an upload to a temporary file (extractors work on paths) and extracts it."""
+    fd, path = tempfile.mkstemp(suffix="." + get_file_extension(file_name))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return extract_document(path)
+    finally:
+        os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Keypoint AI's extraction and summarization as a local HTTP service.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--backend", default="live",
+                        help="Gemini backend: live (default), fake, record:<cassette.jsonl> or replay:<cassette.jsonl>.")
+    parser.add_argument("--fake", action="store_true", help="Shortcut for --backend fake (no API key needed).")
+    args = parser.parse_args()
+
+    spec = "fake" if args.fake else args.backend
+    model_factory = create_model
+    if spec == "live" or spec.startswith("record:"):
+        api_keys = parse_api_keys(os.environ.get("GEMINI_API_KEY", ""))
+        if not api_keys:
+            parser.error("Set GEMINI_API_KEY (comma-separated for several keys) or use --fake / --backend replay:<cassette>.")
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_keys[0])
+        if len(api_keys) > 1 and spec == "live":
+            scheduler = KeyScheduler(api_keys)
+            model_factory = partial(ScheduledModel, scheduler) # Requests spread over the keys by headroom
+    set_backend_factory(backend_factory_from_spec(spec))
+
+    async def run():
+        server = KeypointServer(model_factory)
+        host, port = (await server.start(args.host, args.port))[:2]
+        print(f"Keypoint AI service listening on http://{host}:{port}")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
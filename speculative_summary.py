@@ -0,0 +1,121 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from summary_pipeline import summarize_text
+from token_budget import MeteredModel, plan_text_summary
+
+SPECULATIVE_CACHE_SIZE = 8 # Finished summaries kept; the least recently used is dropped first
+
+
+class SpeculationCancelled(Exception):
+    """Raised between chunks when the text being summarized is no longer current."""
+
+
+def text_key(text):
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+class SpeculativeSummarizer:
+    """
+    Summarizes a document in the background before anyone asks for it, and caches the
+    result by a hash of the text. invalidate() bumps a generation counter. A run checks it
+    before its first model call and between chunks, and a result that went stale during an
+    uninterruptible call is discarded. on_usage(input_tokens, output_tokens) is called from
+    the worker thread after every run that sent anything, finished or not.
+    """
+    def __init__(self, model_factory, on_usage=None, cache_size=SPECULATIVE_CACHE_SIZE):
+        self.model_factory = model_factory
+        self.on_usage = on_usage
+        self.cache_size = cache_size
+        self._cache = OrderedDict() # text key -> summary
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._pending_key = None # Key of the run in flight for the current generation
+        self._pending_done = None # threading.Event set when that run ends
+
+    def start(self, text, plan=None):
+        """
+        Starts summarizing text on a daemon thread unless it is cached or already running.
+        Returns the thread, or None when nothing was started.
+        """
+        key = text_key(text)
+        with self._lock:
+            if key in self._cache or key == self._pending_key:
+                return None
+            self._generation += 1
+            generation = self._generation
+            done = threading.Event()
+            self._pending_key = key
+            self._pending_done = done
+        thread = threading.Thread(target=self._run, args=(text, plan or plan_text_summary(text), key, generation, done),
+                                  name="speculative-summary", daemon=True)
+        thread.start()
+        return thread
+
+    def invalidate(self):
+        """Stops the run in flight at its next model call and drops its result; cached summaries stay (they are keyed by text)."""
+        with self._lock:
+            self._generation += 1
+            self._pending_key = None
+            self._pending_done = None
+
+    def is_running(self, text):
+        with self._lock:
+            return self._pending_key is not None and self._pending_key == text_key(text)
+
+    def cached(self, text):
+        """The finished summary of text, or None."""
+        key = text_key(text)
+        with self._lock:
+            summary = self._cache.get(key)
+            if summary is not None:
+                self._cache.move_to_end(key)
+            return summary
+
+    def wait(self, text, timeout):
+        """
+        Waits up to timeout seconds for a run on text to finish. Returns the summary, or None
+        if nothing is running for this text, the run failed, or it is still going.
+        """
+        key = text_key(text)
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+            done = self._pending_done if key == self._pending_key else None
+        if done is None or not done.wait(timeout):
+            return None
+        return self.cached(text)
+
+    def clear(self):
+        self.invalidate()
+        with self._lock:
+            self._cache.clear()
+
+    def _run(self, text, plan, key, generation, done):
+        model = MeteredModel(self.model_factory())
+
+        def check_current(finished_chunks=0, total=0):
+            if self._generation != generation:
+                raise SpeculationCancelled()
+
+        summary = None
+        try:
+            check_current() # Invalidated while starting up: don't send anything
+            summary = summarize_text(model, text, plan=plan, on_progress=check_current)
+        except Exception:
+            pass # Cancelled or failed; a real click summarizes again and reports any error
+        finally:
+            with self._lock:
+                # A single-call summary can't be interrupted; if the run went stale meanwhile, drop its result
+                if summary and self._generation == generation:
+                    self._cache[key] = summary
+                    self._cache.move_to_end(key)
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+                if self._pending_done is done:
+                    self._pending_key = None
+                    self._pending_done = None
+            done.set()
+            if self.on_usage is not None and (model.input_tokens or model.output_tokens):
+                self.on_usage(model.input_tokens, model.output_tokens) # Calls made before a cancel are still billed
@@ -0,0 +1,213 @@
+import codecs
+import mmap
+import os
+import re
+
+from striprtf.striprtf import rtf_to_text # For RTF
+
+from memory_budget import STREAM_CHUNK_BYTES
+
+# Constants for streamed reading
+CHUNK_BYTES = STREAM_CHUNK_BYTES # Target size of each decoded piece
+DETECT_BYTES = 64 * 1024 # Bytes inspected when guessing the encoding
+STRATIFIED_MIN_PIECES = 3
+SAMPLING_MODES = ("head", "head_tail", "stratified")
+
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+
+# Escaped braces/backslashes first so they never count as group delimiters
+_RTF_TOKEN = re.compile(rb"\\[\\{}]|[{}]|\\par(?![a-zA-Z])")
+
+
+def detect_encoding(head, complete=False):
+    """
+    Guesses the encoding of a file from its first bytes (complete=True when head is the whole file).
+    Returns (encoding, bom_length). Falls back to cp1252 when the bytes aren't valid UTF-8.
+    """
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding, len(bom)
+    try:
+        # final=False tolerates a multi-byte character cut off at the end of the sample
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=complete)
+        return "utf-8", 0
+    except UnicodeDecodeError:
+        return "cp1252", 0
+
+
+class StreamedTextFile:
+    """
+    Memory-maps a TXT or RTF file and decodes it piece by piece, so even
+    multi-gigabyte files never have to be held in memory as one string.
+
+        with StreamedTextFile(path) as stream:
+            for chunk in stream.iter_chunks(budget_bytes=8 * 1024 * 1024, mode="stratified"):
+                ...
+    """
+    def __init__(self, file_path, chunk_bytes=CHUNK_BYTES):
+        self.file_path = file_path
+        self.chunk_bytes = chunk_bytes
+        self.is_rtf = file_path.lower().endswith(".rtf")
+        self.size = os.path.getsize(file_path)
+        self.encoding = "utf-8"
+        self._file = None
+        self._mm = None
+        self._data_start = 0
+        self._ranges = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def open(self):
+        self._file = open(self.file_path, "rb")
+        if self.size:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.encoding, self._data_start = detect_encoding(self._mm[:DETECT_BYTES], self.size <= DETECT_BYTES)
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def ranges(self):
+        """Byte ranges (start, end) of the pieces the file is split into."""
+        if self._ranges is None:
+            if self._mm is None:
+                self._ranges = []
+            elif self.is_rtf:
+                self._ranges = self._rtf_ranges()
+            else:
+                self._ranges = self._text_ranges()
+        return self._ranges
+
+    def _text_ranges(self):
+        newline = "\n".encode(self.encoding)
+        width = len(newline)
+        ranges = []
+        start = self._data_start
+        while start < self.size:
+            end = min(start + self.chunk_bytes, self.size)
+            if end < self.size:
+                # Prefer to cut right after a line break
+                cut = self._mm.rfind(newline, start, end)
+                if cut > start:
+                    end = cut + width
+                else:
+                    end -= (end - self._data_start) % width
+            ranges.append((start, end))
+            start = end
+        return ranges
+
+    def _rtf_ranges(self):
+        # Split only on \par control words at the top level of the document group,
+        # so every piece can be converted on its own
+        ranges = []
+        start = self._data_start
+        depth = 0
+        pos = start
+        while start < self.size:
+            target = start + self.chunk_bytes
+            if target >= self.size:
+                ranges.append((start, self.size))
+                break
+            depth += _brace_delta(self._mm[pos:target])
+            split = None
+            for match in _RTF_TOKEN.finditer(self._mm, target):
+                token = match.group()
+                if token == b"{":
+                    depth += 1
+                elif token == b"}":
+                    depth -= 1
+                elif token.startswith(b"\\par") and depth <= 1:
+                    split = match.end()
+                    break
+            if split is None:
+                ranges.append((start, self.size))
+                break
+            ranges.append((start, split))
+            start = pos = split
+        return ranges
+
+    def iter_chunks(self, budget_bytes=None, mode="stratified"):
+        """
+        Yields decoded text pieces. When budget_bytes is given and the file is
+        larger, only a head, head_tail or stratified sample of pieces is read.
+        """
+        if mode not in SAMPLING_MODES:
+            raise ValueError(f"Unknown sampling mode '{mode}'. Expected one of {SAMPLING_MODES}.")
+        ranges = self.ranges()
+        if budget_bytes is not None:
+            ranges = select_ranges(ranges, budget_bytes, mode)
+
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        previous_end = self._data_start
+        for start, end in ranges:
+            skipped = start - previous_end
+            if skipped:
+                decoder.reset()
+            text = decoder.decode(self._mm[start:end], final=end == self.size)
+            previous_end = end
+            if self.is_rtf:
+                text = self._rtf_piece_to_text(text, start)
+            if skipped:
+                text = f"[... {skipped} bytes skipped ...]\n" + text
+            if text.strip():
+                yield text
+
+    def _rtf_piece_to_text(self, piece, start):
+        if start != self._data_start:
+            piece = "{" + piece # Re-open the document group so closing braces stay balanced
+        try:
+            return rtf_to_text(piece)
+        except Exception:
+            return piece # Fallback to raw RTF if parsing fails
+
+    def preview(self, max_chars):
+        """Decodes just enough of the start of the file to show max_chars characters."""
+        preview = ""
+        for chunk in self.iter_chunks():
+            preview += chunk
+            if len(preview) >= max_chars:
+                break
+        return preview[:max_chars]
+
+
+def select_ranges(ranges, budget_bytes, mode="stratified"):
+    """Picks a subset of ranges that fits budget_bytes using the given sampling mode."""
+    total = sum(end - start for start, end in ranges)
+    if total <= budget_bytes or not ranges:
+        return ranges
+    count = max(1, min(len(ranges), budget_bytes * len(ranges) // total))
+
+    if mode == "head":
+        return ranges[:count]
+    if mode == "head_tail":
+        head = (count + 1) // 2
+        tail = count - head
+        return ranges[:head] + (ranges[-tail:] if tail else [])
+    # stratified: evenly spaced pieces across the whole file, always keeping first and last
+    count = max(count, min(STRATIFIED_MIN_PIECES, len(ranges)))
+    if count == 1:
+        return ranges[:1]
+    step = (len(ranges) - 1) / (count - 1)
+    indices = sorted({round(i * step) for i in range(count)})
+    return [ranges[i] for i in indices]
+
+
+def _brace_delta(data):
+    opened = data.count(b"{") - data.count(b"\\{")
+    closed = data.count(b"}") - data.count(b"\\}")
+    return opened - closed
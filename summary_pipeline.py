@@ -0,0 +1,228 @@
+import io
+import math
+import os
+
+from PIL import Image # For Images
+
+from document_extractor import extract_document, get_file_extension, IMAGE_EXTENSIONS
+from memory_budget import memory_report, EDITOR_CHAR_BUDGET, STREAM_FULL_LIMIT_BYTES, SAMPLE_BUDGET_BYTES
+from stream_reader import StreamedTextFile, select_ranges
+from token_budget import plan_summary, plan_text_summary, estimate_tokens_for_bytes, MAX_OUTPUT_TOKENS
+
+MAX_INPUT_LENGTH = EDITOR_CHAR_BUDGET # Characters the editor holds before files are streamed instead
+TEMPERATURE = 0.3
+COMBINE_BATCH_CHARS = 200000 # Partial summaries combined per reduce call
+LARGE_FILE_SAMPLING_MODE = "stratified" # "head", "head_tail" or "stratified"
+MAX_IMAGE_SIDE = 3072 # Gemini downsamples larger images anyway
+IMAGE_JPEG_QUALITY = 90
+
+TEXT_PROMPT = ("Please provide a comprehensive summary of the following text, "
+               "including key points and main ideas. Aim for clarity and conciseness, "
+               "and and structure the summary with bullet points or short paragraphs:\n\n")
+IMAGE_PROMPT = ("Please provide a concise summary and description of this image, identifying key objects, "
+                "scenes, and any visible text. Aim for clarity and conciseness, and structure the summary "
+                "in bullet points or short paragraphs.")
+CHUNK_PROMPT = ("The following text is part {index} of {total} of a larger document. "
+                "Summarize its key points and main ideas as short bullet points:\n\n")
+COMBINE_PROMPT = ("The following are summaries of consecutive parts of one document. "
+                  "Combine them into a single comprehensive summary with key points and main ideas, "
+                  "removing repetition, and structure it with bullet points or short paragraphs:\n\n")
+UPDATE_PROMPT = ("Below is a summary of an earlier version of a document, followed by the changes in the new "
+                 "version as a line diff (lines starting with '-' were removed, '+' were added). Update the "
+                 "summary so it describes the new version, keeping its structure and everything that didn't "
+                 "change:\n\n")
+
+
+def generate_summary(model, contents, max_output_tokens=MAX_OUTPUT_TOKENS):
+    """Sends contents to the model and returns the stripped response text ("" if nothing came back)."""
+    response = model.generate_content(
+        contents,
+        generation_config={
+            "max_output_tokens": max_output_tokens,
+            "temperature": TEMPERATURE,
+        }
+    )
+    return response.text.strip() if response.text else ""
+
+
+def stream_generate(model, contents, max_output_tokens=MAX_OUTPUT_TOKENS):
+    """Like generate_summary, but yields the response text piece by piece as the model streams it."""
+    response = model.generate_content(
+        contents,
+        generation_config={
+            "max_output_tokens": max_output_tokens,
+            "temperature": TEMPERATURE,
+        },
+        stream=True
+    )
+    for chunk in response:
+        if chunk.text:
+            yield chunk.text
+
+
+def stream_summary(model, text, max_output_tokens=None, plan=None):
+    """
+    Streams a summary of text. Texts the planner sends to chunked mode are
+    summarized chunk by chunk first; only the final combining step is streamed.
+    """
+    plan = plan or plan_text_summary(text)
+    max_output_tokens = max_output_tokens or plan.max_output_tokens
+    if plan.mode == "single":
+        yield from stream_generate(model, [TEXT_PROMPT, text], max_output_tokens)
+        return
+
+    total = math.ceil(len(text) / plan.chunk_chars)
+    partials = [generate_summary(model, [CHUNK_PROMPT.format(index=index, total=total), chunk],
+                                 plan.chunk_output_tokens)
+                for index, chunk in enumerate(_iter_slices(text, plan.chunk_chars), start=1)]
+    partials = [partial for partial in partials if partial]
+    while sum(len(partial) for partial in partials) > COMBINE_BATCH_CHARS and len(partials) > 2:
+        # Shrink in pairs until everything fits in one final streamed combine
+        partials = [combine_summaries(model, partials[i:i + 2], plan.chunk_output_tokens)
+                    for i in range(0, len(partials), 2)]
+    if len(partials) == 1:
+        yield partials[0]
+    elif partials:
+        yield from stream_generate(model, [COMBINE_PROMPT, "\n\n---\n\n".join(partials)], max_output_tokens)
+
+
+def summarize_text(model, text, max_output_tokens=None, plan=None, on_progress=None):
+    """
+    Summarizes text in one call or chunk by chunk, as chosen by the token planner.
+    max_output_tokens overrides the planned output budget.
+    """
+    plan = plan or plan_text_summary(text)
+    max_output_tokens = max_output_tokens or plan.max_output_tokens
+    if plan.mode == "chunked":
+        total = math.ceil(len(text) / plan.chunk_chars)
+        return summarize_chunks(model, _iter_slices(text, plan.chunk_chars), total, on_progress,
+                                max_output_tokens, plan.chunk_output_tokens)
+    # Prompt and text go as separate parts so the (possibly huge) text is never copied into an f-string
+    return generate_summary(model, [TEXT_PROMPT, text], max_output_tokens)
+
+
+def _iter_slices(text, max_chars):
+    # Lazy, so only one chunk-sized copy of the text exists at a time
+    for start in range(0, len(text), max_chars):
+        yield text[start:start + max_chars]
+
+
+def summarize_image(model, image, max_output_tokens=MAX_OUTPUT_TOKENS):
+    """image is a PIL image or an encoded blob from encode_image()."""
+    return generate_summary(model, [IMAGE_PROMPT, image], max_output_tokens)
+
+
+def encode_image(image):
+    """
+    Encodes a PIL image once into the inline blob Gemini accepts, downscaling very large
+    images first, so the decoded pixels can be released right after loading.
+    """
+    if max(image.size) > MAX_IMAGE_SIDE:
+        image = image.copy()
+        image.thumbnail((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE))
+    buffer = io.BytesIO()
+    if image.mode in ("RGBA", "LA", "P"):
+        image.save(buffer, format="PNG") # Keep transparency and palettes lossless
+        mime_type = "image/png"
+    else:
+        image.convert("RGB").save(buffer, format="JPEG", quality=IMAGE_JPEG_QUALITY)
+        mime_type = "image/jpeg"
+    return {"mime_type": mime_type, "data": buffer.getvalue()}
+
+
+def update_summary(model, previous_summary, changes, max_output_tokens=MAX_OUTPUT_TOKENS):
+    """Revises an earlier summary from a diff instead of summarizing the whole new version again."""
+    return generate_summary(model, [UPDATE_PROMPT, "Summary:\n" + previous_summary, "Changes:\n" + changes],
+                            max_output_tokens)
+
+
+def summarize_chunks(model, chunks, total=None, on_progress=None, max_output_tokens=MAX_OUTPUT_TOKENS,
+                     chunk_output_tokens=None):
+    """
+    Map-reduce summary over an iterable of text chunks: each chunk is summarized
+    as it arrives, then the partial summaries are combined. Chunks are consumed
+    lazily, so a streamed file never has to be held in memory as a whole.
+    on_progress(done, total) is called after each chunk.
+    """
+    partials = []
+    for index, chunk in enumerate(chunks, start=1):
+        prompt = CHUNK_PROMPT.format(index=index, total=total or "?")
+        partial = generate_summary(model, [prompt, chunk], chunk_output_tokens or max_output_tokens)
+        if partial:
+            partials.append(partial)
+        if on_progress:
+            on_progress(index, total)
+
+    if not partials:
+        return ""
+    if len(partials) == 1:
+        return partials[0]
+    return combine_summaries(model, partials, max_output_tokens)
+
+
+def combine_summaries(model, partials, max_output_tokens=MAX_OUTPUT_TOKENS):
+    """Reduces partial summaries to one, combining in batches until a single summary is left."""
+    while len(partials) > 1:
+        batches = [[]]
+        batch_chars = 0
+        for partial in partials:
+            if batches[-1] and batch_chars + len(partial) > COMBINE_BATCH_CHARS:
+                batches.append([])
+                batch_chars = 0
+            batches[-1].append(partial)
+            batch_chars += len(partial)
+        if len(batches) == len(partials):
+            # Every partial fills a batch on its own; combine pairwise so the loop still shrinks
+            batches = [partials[i:i + 2] for i in range(0, len(partials), 2)]
+        partials = [generate_summary(model, [COMBINE_PROMPT, "\n\n---\n\n".join(batch)], max_output_tokens)
+                    if len(batch) > 1 else batch[0]
+                    for batch in batches]
+    return partials[0]
+
+
+def summarize_stream(model, file_path, on_progress=None, max_output_tokens=None):
+    """Map-reduce summary of a large TXT/RTF file, streamed from disk (sampled if very large)."""
+    with StreamedTextFile(file_path) as stream:
+        budget = None if stream.size <= STREAM_FULL_LIMIT_BYTES else SAMPLE_BUDGET_BYTES
+        ranges = select_ranges(stream.ranges(), budget, LARGE_FILE_SAMPLING_MODE) if budget else stream.ranges()
+        plan = plan_stream_summary(stream.size)
+        return summarize_chunks(model, stream.iter_chunks(budget, LARGE_FILE_SAMPLING_MODE), len(ranges),
+                                on_progress, max_output_tokens or plan.max_output_tokens, plan.chunk_output_tokens)
+
+
+def plan_stream_summary(file_size):
+    """Token plan for a streamed file, based on the bytes that will actually be sent."""
+    sent_bytes = file_size if file_size <= STREAM_FULL_LIMIT_BYTES else SAMPLE_BUDGET_BYTES
+    return plan_summary(estimate_tokens_for_bytes(sent_bytes))
+
+
+def is_large_text_file(file_path):
+    """
+    True for TXT/RTF files too big to load into the editor; these are streamed instead.
+    Once a tracked stage has gone over the memory budget, every TXT/RTF file is streamed.
+    """
+    if get_file_extension(file_path) not in ("txt", "rtf"):
+        return False
+    return os.path.getsize(file_path) > MAX_INPUT_LENGTH or bool(memory_report.over_budget())
+
+
+def summarize_file(model, file_path, on_progress=None, max_output_tokens=None):
+    """
+    Summarizes any supported file without the GUI: images directly, large TXT/RTF
+    files by streaming, and everything else through extract_document (chunked on
+    block boundaries when the planner says the text is too long for one call).
+    """
+    if get_file_extension(file_path) in IMAGE_EXTENSIONS:
+        with Image.open(file_path) as image:
+            blob = encode_image(image)
+        return summarize_image(model, blob, max_output_tokens or MAX_OUTPUT_TOKENS)
+    if is_large_text_file(file_path):
+        return summarize_stream(model, file_path, on_progress, max_output_tokens)
+
+    document = extract_document(file_path)
+    plan = plan_text_summary(document.text)
+    if plan.mode == "chunked":
+        chunk_ranges = document.chunk_ranges(plan.chunk_chars)
+        return summarize_chunks(model, document.iter_chunks(plan.chunk_chars), len(chunk_ranges), on_progress,
+                                max_output_tokens or plan.max_output_tokens, plan.chunk_output_tokens)
+    return summarize_text(model, document.text, max_output_tokens, plan)
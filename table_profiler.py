@@ -0,0 +1,244 @@
+import numpy as np # For vectorized aggregates
+import pandas as pd # For chunked CSV reading
+import openpyxl # For streaming XLSX rows
+
+# Constants for the table profile
+CSV_CHUNK_SIZE = 200000 # Rows per pandas chunk
+XLSX_CHUNK_SIZE = 50000 # Rows buffered per sheet before profiling
+TOP_CATEGORIES = 5 # Most frequent values shown per text column
+CATEGORY_TRACK_LIMIT = 1000 # Distinct values kept per column while counting
+SAMPLE_ROWS = 10 # Randomly sampled rows shown in the profile
+MAX_CELL_WIDTH = 60 # Long cell values are cut in the sample table
+
+
+class TableProfile:
+    """
+    Accumulates a compact statistical profile of a table one chunk at a time.
+    Only running aggregates are kept, so memory stays flat no matter how many rows are fed in.
+    """
+    def __init__(self, name, sample_rows=SAMPLE_ROWS, seed=0):
+        self.name = name
+        self.sample_rows = sample_rows
+        self.row_count = 0
+        self.columns = [] # Column names in first-seen order
+        self.dtypes = {} # Column -> set of pandas dtype names seen across chunks
+        self.null_counts = {}
+        self.kinds = {} # Column -> "numeric" or "text", fixed by the first chunk with values
+        self.numeric = {} # Column -> [count, mean, M2 (sum of squared deviations), min, max]
+        self.non_numeric = {} # Numeric column -> values in later chunks that weren't numbers
+        self.categories = {} # Column -> pd.Series of value counts
+        self._rng = np.random.default_rng(seed)
+        self._sample = None # Reservoir of rows, each with a random sort key
+        self._sample_keys = None
+
+    def add_chunk(self, df):
+        """Folds one DataFrame chunk into the running profile."""
+        if df.empty:
+            return
+        self.row_count += len(df)
+
+        for column in df.columns:
+            if column not in self.dtypes:
+                self.columns.append(column)
+                self.dtypes[column] = set()
+                self.null_counts[column] = 0
+            series = df[column]
+            self.dtypes[column].add(str(series.dtype))
+            nulls = int(series.isna().sum())
+            self.null_counts[column] += nulls
+            if nulls == len(series):
+                continue # All-null chunks say nothing about the column's kind
+
+            kind = self.kinds.get(column)
+            if kind is None:
+                is_numeric = pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+                kind = self.kinds[column] = "numeric" if is_numeric else "text"
+            if kind == "numeric":
+                self._add_numeric(column, series)
+            else:
+                self._add_categories(column, series)
+
+        self._add_sample(df)
+
+    def _add_numeric(self, column, series):
+        if not pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+            # A later chunk of a numeric column holds text: keep the numbers, count and list the rest
+            text = series.dropna()
+            numbers = pd.to_numeric(text, errors="coerce")
+            other = text[numbers.isna()]
+            if not other.empty:
+                self.non_numeric[column] = self.non_numeric.get(column, 0) + len(other)
+                self._add_categories(column, other)
+            series = numbers
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        stats = self.numeric.get(column)
+        # Per-chunk mean and squared deviations around it; sum_sq - mean^2 cancels badly for large values
+        chunk_mean = values.mean()
+        chunk_stats = [values.size, chunk_mean, np.square(values - chunk_mean).sum(), values.min(), values.max()]
+        if stats is None:
+            self.numeric[column] = chunk_stats
+            return
+        # Chan et al. parallel merge of two (count, mean, M2) summaries
+        count = stats[0] + chunk_stats[0]
+        delta = chunk_stats[1] - stats[1]
+        stats[1] += delta * chunk_stats[0] / count
+        stats[2] += chunk_stats[2] + delta * delta * stats[0] * chunk_stats[0] / count
+        stats[0] = count
+        stats[3] = min(stats[3], chunk_stats[3])
+        stats[4] = max(stats[4], chunk_stats[4])
+
+    def _add_categories(self, column, series):
+        counts = series.dropna().astype(str).value_counts()
+        previous = self.categories.get(column)
+        if previous is not None:
+            counts = previous.add(counts, fill_value=0)
+        # Keep only the heaviest values so high-cardinality columns don't grow without bound
+        if len(counts) > CATEGORY_TRACK_LIMIT:
+            counts = counts.nlargest(CATEGORY_TRACK_LIMIT)
+        self.categories[column] = counts
+
+    def _add_sample(self, df):
+        # Reservoir sampling by random keys: keep the rows with the smallest keys seen so far
+        keys = self._rng.random(len(df))
+        if len(df) > self.sample_rows:
+            keep = np.argpartition(keys, self.sample_rows)[:self.sample_rows]
+            df = df.iloc[keep]
+            keys = keys[keep]
+        if self._sample is not None:
+            df = pd.concat([self._sample, df], ignore_index=True)
+            keys = np.concatenate([self._sample_keys, keys])
+            if len(df) > self.sample_rows:
+                keep = np.argpartition(keys, self.sample_rows)[:self.sample_rows]
+                df = df.iloc[keep]
+                keys = keys[keep]
+        self._sample = df.reset_index(drop=True)
+        self._sample_keys = keys
+
+    def to_text(self):
+        """Renders the profile as a short plain-text report suitable for a prompt."""
+        lines = [f"--- Table: {self.name} ---",
+                 f"Rows: {self.row_count}  Columns: {len(self.columns)}",
+                 "",
+                 "Schema (column | dtype | null rate):"]
+        for column in self.columns:
+            null_rate = self.null_counts[column] / self.row_count if self.row_count else 0.0
+            dtype = "/".join(sorted(self.dtypes[column]))
+            lines.append(f"- {column} | {dtype} | {null_rate:.1%}")
+
+        if self.numeric:
+            lines.append("")
+            lines.append("Numeric columns (count | mean | std | min | max):")
+            for column in self.columns:
+                stats = self.numeric.get(column)
+                if stats is None:
+                    continue
+                count, mean, m2, low, high = stats
+                line = f"- {column} | {count} | {mean:.4g} | {np.sqrt(m2 / count):.4g} | {low:.4g} | {high:.4g}"
+                if column in self.non_numeric:
+                    line += f" (+{self.non_numeric[column]} non-numeric values)"
+                lines.append(line)
+
+        if self.categories:
+            lines.append("")
+            lines.append(f"Top categories (up to {TOP_CATEGORIES} per column):")
+            for column in self.columns:
+                counts = self.categories.get(column)
+                if counts is None or counts.empty:
+                    continue
+                top = counts.nlargest(TOP_CATEGORIES)
+                values = ", ".join(f"{_shorten(str(value))} ({int(count)})" for value, count in top.items())
+                lines.append(f"- {column}: {values}")
+
+        if self._sample is not None and not self._sample.empty:
+            lines.append("")
+            lines.append(f"Sampled rows ({len(self._sample)} of {self.row_count}):")
+            # str() per cell: astype(str) keeps NaN as a missing value with pandas' string dtype
+            sample = self._sample.apply(lambda col: col.map(lambda value: _shorten(str(value))))
+            lines.append(sample.to_string(index=False))
+
+        return "\n".join(lines)
+
+
+def _shorten(value):
+    if len(value) > MAX_CELL_WIDTH:
+        return value[:MAX_CELL_WIDTH - 3] + "..."
+    return value
+
+
+def profile_csv(file_path, chunk_size=CSV_CHUNK_SIZE, on_chunk=None):
+    """
+    Reads a CSV file in chunks and returns a compact text profile of it
+    instead of the full table. on_chunk(rows_so_far) is called after each chunk.
+    """
+    profile = TableProfile(file_path.replace("\\", "/").split('/')[-1])
+    for chunk in pd.read_csv(file_path, chunksize=chunk_size, low_memory=False):
+        profile.add_chunk(chunk)
+        if on_chunk is not None:
+            on_chunk(profile.row_count)
+    return profile.to_text()
+
+
+def profile_xlsx(file_path, chunk_size=XLSX_CHUNK_SIZE):
+    """
+    Streams every sheet of an XLSX workbook in read-only mode and returns
+    one compact text profile per sheet.
+    """
+    return "\n\n".join(report for _, report in iter_xlsx_profiles(file_path, chunk_size))
+
+
+def iter_xlsx_profiles(file_path, chunk_size=XLSX_CHUNK_SIZE, on_chunk=None):
+    """
+    Yields (sheet_name, profile_text) for each non-empty sheet of an XLSX workbook.
+    on_chunk(sheet_name, rows_so_far) is called after each buffered chunk.
+    """
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for sheet_name in workbook.sheetnames:
+            profile = TableProfile(f"Sheet {sheet_name}")
+            rows = workbook[sheet_name].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                continue
+            header = _unique_names(str(name) if name is not None else f"column_{i + 1}" for i, name in enumerate(header))
+
+            width = len(header)
+            buffer = []
+            for row in rows:
+                buffer.append(tuple(row[:width]) + (None,) * (width - len(row)))
+                if len(buffer) >= chunk_size:
+                    profile.add_chunk(_frame_from_rows(buffer, header))
+                    buffer = []
+                    if on_chunk is not None:
+                        on_chunk(sheet_name, profile.row_count)
+            if buffer:
+                profile.add_chunk(_frame_from_rows(buffer, header))
+            if on_chunk is not None:
+                on_chunk(sheet_name, profile.row_count)
+            yield sheet_name, profile.to_text()
+    finally:
+        workbook.close()
+
+
+def _unique_names(names):
+    """Renames repeated header cells to name.1, name.2, ... the way read_csv does."""
+    names = list(names)
+    taken = set(names) # A later header may literally be "name.1"; don't collide with it
+    seen = set()
+    unique = []
+    for name in names:
+        candidate, suffix = name, 0
+        while candidate in seen or (suffix and candidate in taken):
+            suffix += 1
+            candidate = f"{name}.{suffix}"
+        seen.add(candidate)
+        unique.append(candidate)
+    return unique
+
+
+def _frame_from_rows(rows, header):
+    df = pd.DataFrame.from_records(rows, columns=header)
+    # openpyxl hands back Python objects; let pandas pick proper numeric dtypes
+    return df.infer_objects()
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# The app is a set of top-level modules; make them importable from the tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# db_manager creates users.db in the working directory on import; keep it out of the checkout
+os.chdir(tempfile.mkdtemp(prefix="keypoint-tests-"))
@@ -0,0 +1,37 @@
+from pptx import Presentation
+from pptx.util import Inches
+
+from document_extractor import extract_document
+
+
+def test_pptx_includes_groups_tables_and_notes(tmp_path):
+    presentation = Presentation()
+    slide = presentation.slides.add_slide(presentation.slide_layouts[6]) # Blank layout
+    slide.shapes.add_textbox(Inches(1), Inches(1), Inches(2), Inches(1)).text_frame.text = "Plain box"
+    group = slide.shapes.add_group_shape()
+    inner = group.shapes.add_group_shape()
+    inner.shapes.add_textbox(Inches(1), Inches(2), Inches(2), Inches(1)).text_frame.text = "Nested in a group"
+    table = slide.shapes.add_table(2, 2, Inches(1), Inches(3), Inches(4), Inches(1)).table
+    for row, values in enumerate([("Quarter", "Revenue"), ("Q1", "120")]):
+        for column, value in enumerate(values):
+            table.cell(row, column).text = value
+    slide.notes_slide.notes_text_frame.text = "Mention the Q1 spike"
+    path = tmp_path / "deck.pptx"
+    presentation.save(path)
+
+    document = extract_document(str(path))
+    blocks = [(block.kind, document.block_text(block), block.location) for block in document.blocks]
+    assert ("slide", "Plain box", "slide 1") in blocks
+    assert ("slide", "Nested in a group", "slide 1") in blocks
+    assert ("table row", "Quarter | Revenue", "slide 1 table row 1") in blocks
+    assert ("table row", "Q1 | 120", "slide 1 table row 2") in blocks
+    assert blocks[-1] == ("notes", "Mention the Q1 spike", "slide 1 notes")
+
+
+def test_txt_keeps_indentation_inside_paragraphs(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("Steps:\n  - first\n    - nested\n\n\n    def main():\n        return 1\n", encoding="utf-8")
+
+    document = extract_document(str(path))
+    texts = [document.block_text(block) for block in document.blocks]
+    assert texts == ["Steps:\n  - first\n    - nested", "    def main():\n        return 1"]
@@ -0,0 +1,36 @@
+import zipfile
+
+from docx_stream import iter_docx_blocks
+
+NAMESPACES = ('xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+              'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006" '
+              'xmlns:wps="http://schemas.microsoft.com/office/word/2010/wordprocessingShape" '
+              'xmlns:v="urn:schemas-microsoft-com:vml"')
+
+
+def paragraph(text, extra=""):
+    return f"<w:p><w:r><w:t>{text}</w:t></w:r>{extra}</w:p>"
+
+
+def text_box(text):
+    # Word's layout: the DrawingML text box in mc:Choice, the same text again as VML in mc:Fallback
+    return ("<w:r><mc:AlternateContent>"
+            f"<mc:Choice Requires=\"wps\"><wps:txbx><w:txbxContent>{paragraph(text)}</w:txbxContent></wps:txbx></mc:Choice>"
+            f"<mc:Fallback><v:textbox><w:txbxContent>{paragraph(text)}</w:txbxContent></v:textbox></mc:Fallback>"
+            "</mc:AlternateContent></w:r>")
+
+
+def write_docx(path, body):
+    with zipfile.ZipFile(path, "w") as package:
+        package.writestr("word/document.xml", f"<w:document {NAMESPACES}><w:body>{body}</w:body></w:document>")
+
+
+def test_text_box_fallback_copy_is_skipped(tmp_path):
+    path = tmp_path / "boxes.docx"
+    cell = f"<w:tc>{paragraph('Cell', text_box('Cell box'))}</w:tc>"
+    write_docx(path, paragraph("Intro ", text_box("Box text")) + f"<w:tbl><w:tr>{cell}<w:tc>{paragraph('Other')}</w:tc></w:tr></w:tbl>")
+
+    assert list(iter_docx_blocks(str(path))) == [
+        ("paragraph", "Intro Box text", "paragraph 1"),
+        ("table row", "CellCell box | Other", "table row 1"),
+    ]
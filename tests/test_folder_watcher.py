@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from folder_watcher import FolderWatcher, is_watchable
+from job_queue import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.db"))
+
+
+def make_watcher(folder, queue, tmp_path, **options):
+    return FolderWatcher(str(folder), queue, "alice", database=str(tmp_path / "watch.db"), stable_seconds=0, **options)
+
+
+def settle(watcher):
+    # First pass starts the debounce, the second queues what stayed unchanged
+    return watcher.scan() + watcher.scan()
+
+
+def test_summary_files_are_not_watchable():
+    assert is_watchable("report.txt")
+    assert not is_watchable("report.txt.summary.txt")
+    assert not is_watchable("~$report.docx")
+
+
+def test_output_folder_is_excluded(tmp_path, queue):
+    inbox = tmp_path / "inbox"
+    output = inbox / "summaries"
+    output.mkdir(parents=True)
+    (inbox / "notes.txt").write_text("some notes")
+    (output / "notes.txt.summary.txt").write_text("summary")
+    (output / "stray.txt").write_text("not picked up either")
+
+    watcher = make_watcher(inbox, queue, tmp_path, recursive=True, excluded_folders=[str(output)])
+    queued = settle(watcher)
+    assert [queue.get_job(job_id)["payload"]["file_path"] for job_id in queued] == [str(inbox / "notes.txt")]
+
+
+def test_same_content_is_not_summarized_twice(tmp_path, queue):
+    (tmp_path / "a.txt").write_text("identical")
+    watcher = make_watcher(tmp_path, queue, tmp_path)
+    assert len(settle(watcher)) == 1
+    (tmp_path / "copy.txt").write_text("identical")
+    assert settle(watcher) == []
+
+
+def test_content_whose_job_failed_is_queued_again(tmp_path, queue):
+    (tmp_path / "a.txt").write_text("will fail")
+    watcher = make_watcher(tmp_path, queue, tmp_path)
+    [job_id] = settle(watcher)
+    queue.cancel(job_id)
+
+    (tmp_path / "copy.txt").write_text("will fail")
+    [retry_id] = settle(watcher)
+    assert retry_id != job_id
+
+
+def test_skip_existing_checkpoints_without_queueing(tmp_path, queue):
+    (tmp_path / "old.txt").write_text("backlog")
+    watcher = make_watcher(tmp_path, queue, tmp_path)
+    watcher.skip_existing()
+    assert settle(watcher) == []
+    (tmp_path / "old.txt").write_text("backlog, edited")
+    os.utime(tmp_path / "old.txt", (1, 1))
+    assert len(settle(watcher)) == 1
+
+
+def test_content_skipped_without_a_job_is_queued_when_it_appears_again(tmp_path, queue):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    (inbox / "old.txt").write_text("backlog")
+    watcher = make_watcher(inbox, queue, tmp_path)
+    watcher.skip_existing()
+
+    (inbox / "copy.txt").write_text("backlog") # Same content, never summarized
+    [job_id] = settle(watcher)
+    assert queue.get_job(job_id)["payload"]["file_path"] == str(inbox / "copy.txt")
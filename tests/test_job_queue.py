@@ -0,0 +1,151 @@
+import threading
+import time
+
+import pytest
+
+import job_queue
+from job_queue import JobQueue, JobWorkerPool, STATUS_DONE, STATUS_FAILED, STATUS_QUEUED, STATUS_RUNNING
+
+
+@pytest.fixture
+def database(tmp_path):
+    return str(tmp_path / "jobs.db")
+
+
+def test_claim_takes_each_job_once_across_queues(database):
+    app, watcher = JobQueue(database, owner="app"), JobQueue(database, owner="watcher")
+    job_ids = [app.enqueue("alice", {"text": f"doc {i}"}) for i in range(20)]
+    claimed = []
+    lock = threading.Lock()
+
+    def worker(queue):
+        while True:
+            job = queue.claim()
+            if job is None:
+                return
+            with lock:
+                claimed.append(job["id"])
+
+    threads = [threading.Thread(target=worker, args=(queue,)) for queue in (app, watcher) * 3]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == job_ids
+
+
+def test_recover_leaves_another_process_running_jobs_alone(database):
+    app = JobQueue(database, owner="app")
+    job_id = app.enqueue("alice", {"text": "long document"})
+    assert app.claim()["owner"] == "app"
+
+    watcher = JobQueue(database, owner="watcher") # A second process starting up
+    assert watcher.recover_interrupted() == 0
+    assert watcher.claim() is None
+    assert watcher.get_job(job_id)["status"] == STATUS_RUNNING
+
+
+def test_expired_lease_is_recovered_and_claimable(database, monkeypatch):
+    crashed = JobQueue(database, owner="crashed")
+    job_id = crashed.enqueue("alice", {"text": "doc"})
+    crashed.claim()
+
+    later = time.time() + job_queue.LEASE_SECONDS + 1
+    monkeypatch.setattr(job_queue.time, "time", lambda: later)
+    other = JobQueue(database, owner="other")
+    job = other.claim() # Taken over without waiting for a restart
+    assert job["id"] == job_id
+    assert job["owner"] == "other"
+    assert job["attempts"] == 2
+
+    assert not crashed.complete(job_id, "late result") # The old owner lost the lease
+    assert other.complete(job_id, "summary")
+    assert other.get_job(job_id)["result"] == "summary"
+
+
+def test_recover_interrupted_requeues_expired_jobs(database, monkeypatch):
+    queue = JobQueue(database, owner="old")
+    job_id = queue.enqueue("alice", {"text": "doc"})
+    queue.claim()
+    later = time.time() + job_queue.LEASE_SECONDS + 1
+    monkeypatch.setattr(job_queue.time, "time", lambda: later)
+    assert JobQueue(database, owner="new").recover_interrupted() == 1
+    assert queue.get_job(job_id)["status"] == STATUS_QUEUED
+
+
+def test_renew_leases_extends_only_own_jobs(database):
+    app, watcher = JobQueue(database, owner="app"), JobQueue(database, owner="watcher")
+    first, second = app.enqueue("alice", {"text": "a"}), app.enqueue("alice", {"text": "b"})
+    app.claim()
+    watcher.claim()
+    assert app.renew_leases() == 1
+    assert app.get_job(first)["owner"] == "app"
+    assert app.get_job(second)["owner"] == "watcher"
+
+
+def test_failed_jobs_retry_then_fail(database, monkeypatch):
+    monkeypatch.setattr(job_queue, "RETRY_BACKOFF_SECONDS", 0)
+    queue = JobQueue(database)
+    job_id = queue.enqueue("alice", {"text": "doc"}, max_retries=1)
+    assert queue.fail(queue.claim()["id"], "boom")
+    assert queue.get_job(job_id)["status"] == STATUS_QUEUED
+    assert queue.fail(queue.claim()["id"], "boom again")
+    assert queue.get_job(job_id)["status"] == STATUS_FAILED
+    assert queue.statuses([job_id, 999]) == {job_id: STATUS_FAILED}
+
+
+def test_worker_pool_runs_jobs(database):
+    queue = JobQueue(database)
+    job_ids = [queue.enqueue("alice", {"text": f"doc {i}"}) for i in range(5)]
+    pool = JobWorkerPool(queue, lambda job: job["payload"]["text"].upper(), worker_count=2, poll_interval=0.01)
+    pool.start()
+    deadline = time.time() + 5
+    while time.time() < deadline and any(queue.get_job(job_id)["status"] != STATUS_DONE for job_id in job_ids):
+        time.sleep(0.01)
+    pool.stop()
+    assert [queue.get_job(job_id)["result"] for job_id in job_ids] == [f"DOC {i}" for i in range(5)]
+    assert not pool.is_running()
+
+
+def test_old_database_gains_lease_columns(database):
+    import sqlite3
+
+    conn = sqlite3.connect(database)
+    conn.execute("CREATE TABLE jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL, kind TEXT NOT NULL, "
+                 "title TEXT NOT NULL, payload TEXT NOT NULL, priority INTEGER NOT NULL DEFAULT 0, status TEXT NOT NULL, "
+                 "attempts INTEGER NOT NULL DEFAULT 0, max_retries INTEGER NOT NULL, result TEXT, error TEXT, "
+                 "run_after REAL NOT NULL, created_at REAL NOT NULL, started_at REAL, finished_at REAL)")
+    conn.execute("INSERT INTO jobs (username, kind, title, payload, status, max_retries, run_after, created_at) "
+                 "VALUES ('alice', 'summarize', '', '{}', 'running', 3, 0, 0)")
+    conn.commit()
+    conn.close()
+
+    queue = JobQueue(database)
+    assert queue.recover_interrupted() == 1 # Rows from before leases count as expired
+
+
+def test_worker_pool_retries_a_locked_status_write(database, monkeypatch):
+    import sqlite3
+
+    monkeypatch.setattr(job_queue, "STATUS_WRITE_RETRY_SECONDS", 0)
+    queue = JobQueue(database)
+    job_id = queue.enqueue("alice", {"text": "doc"})
+    complete = queue.complete
+    calls = []
+
+    def locked_once(finished_id, result):
+        calls.append(finished_id)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return complete(finished_id, result)
+
+    monkeypatch.setattr(queue, "complete", locked_once)
+    pool = JobWorkerPool(queue, lambda job: "summary", worker_count=1, poll_interval=0.01)
+    pool.start()
+    deadline = time.time() + 5
+    while time.time() < deadline and queue.get_job(job_id)["status"] != STATUS_DONE:
+        time.sleep(0.01)
+    pool.stop()
+    assert calls == [job_id, job_id]
+    assert queue.get_job(job_id)["result"] == "summary"
+    assert not pool.is_running()
@@ -0,0 +1,120 @@
+import pytest
+
+import key_scheduler
+from fake_gemini import FakeGeminiModel
+from gemini_backend import QuotaExceededError
+from key_scheduler import KeyScheduler, KeysExhaustedError, ScheduledModel, RATE_WINDOW_SECONDS
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(key_scheduler.time, "monotonic", fake)
+    return fake
+
+
+def test_release_corrects_the_estimate_in_place(clock):
+    scheduler = KeyScheduler(["k1"], tpm_limit=10000)
+    reservation = scheduler.acquire(9000)
+    clock.now += 1
+    scheduler.release(reservation, actual_tokens=1000)
+    assert scheduler.states["k1"].token_total == 1000
+
+    clock.now += RATE_WINDOW_SECONDS # The original entry ages out with its corrected count
+    scheduler.states["k1"].prune(clock.now)
+    assert scheduler.states["k1"].token_total == 0
+
+
+def test_failed_call_never_drives_the_window_negative(clock):
+    scheduler = KeyScheduler(["k1"], tpm_limit=10000)
+    scheduler.release(scheduler.acquire(9000), actual_tokens=0)
+    clock.now += RATE_WINDOW_SECONDS + 1
+    scheduler.states["k1"].prune(clock.now)
+    assert scheduler.states["k1"].token_total == 0
+
+    # The key must not take more than its limit afterwards
+    scheduler.acquire(10000, timeout=0)
+    with pytest.raises(KeysExhaustedError):
+        scheduler.acquire(1, timeout=0)
+
+
+def test_release_after_the_entry_left_the_window_changes_nothing(clock):
+    scheduler = KeyScheduler(["k1"], tpm_limit=10000)
+    reservation = scheduler.acquire(5000)
+    clock.now += RATE_WINDOW_SECONDS + 1
+    scheduler.states["k1"].prune(clock.now)
+    scheduler.release(reservation, actual_tokens=100)
+    assert scheduler.states["k1"].token_total == 0
+
+
+def test_requests_go_to_the_key_with_most_headroom(clock):
+    scheduler = KeyScheduler(["k1", "k2", "k3"], rpm_limit=2)
+    keys = [scheduler.acquire(10, timeout=0).key for _ in range(6)]
+    assert sorted(keys) == ["k1", "k1", "k2", "k2", "k3", "k3"]
+    with pytest.raises(KeysExhaustedError):
+        scheduler.acquire(10, timeout=0)
+
+
+def test_quota_error_cools_the_key_down_and_retries_on_another(clock):
+    calls = []
+
+    class QuotaModel:
+        def generate_content(self, contents, generation_config=None, stream=False):
+            calls.append("k1")
+            raise QuotaExceededError()
+
+    def model_for_key(key, model_name):
+        return QuotaModel() if key == "k1" else FakeGeminiModel()
+
+    scheduler = KeyScheduler(["k1", "k2"], model_for_key=model_for_key)
+    scheduler.states["k2"].requests.append(clock.now) # Make k1 the first choice
+    response = ScheduledModel(scheduler).generate_content(["some text"])
+    assert calls == ["k1"]
+    assert response.text
+    assert scheduler.states["k1"].cooldown_until > clock.now
+    assert scheduler.states["k1"].token_total == 0 # The failed call's estimate was refunded
+
+
+def test_models_are_cached_per_key(clock):
+    created = []
+
+    def model_for_key(key, model_name):
+        created.append(key)
+        return FakeGeminiModel()
+
+    scheduler = KeyScheduler(["k1", "k2"], model_for_key=model_for_key)
+    for _ in range(10):
+        ScheduledModel(scheduler).generate_content(["text"])
+    assert sorted(created) == ["k1", "k2"]
+
+    scheduler.close()
+    ScheduledModel(scheduler).generate_content(["text"])
+    assert len(created) == 3 # A closed scheduler opens fresh clients on demand
+
+
+def test_streamed_response_is_released_when_consumed(clock):
+    scheduler = KeyScheduler(["k1"], model_for_key=lambda key, model_name: FakeGeminiModel())
+    pieces = list(ScheduledModel(scheduler).generate_content(["stream me"], stream=True))
+    assert pieces
+    assert scheduler.states["k1"].in_flight == 0
+
+
+def test_gui_thread_fails_fast_with_the_retry_time(clock):
+    import threading
+
+    scheduler = KeyScheduler(["k1"], rpm_limit=1, model_for_key=lambda key, model_name: FakeGeminiModel())
+    model = ScheduledModel(scheduler, fail_fast_thread=threading.current_thread())
+    model.generate_content(["first"])
+    clock.now += 20
+    with pytest.raises(KeysExhaustedError) as error:
+        model.generate_content(["second"]) # Would wait 40 s for the window on a worker thread
+    assert error.value.retry_after == pytest.approx(RATE_WINDOW_SECONDS - 20)
+    assert "retry in 40 s" in str(error.value)
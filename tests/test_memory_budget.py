@@ -0,0 +1,22 @@
+import memory_budget
+import summary_pipeline
+from memory_budget import MemoryReport
+
+
+def test_thresholds_follow_the_budget():
+    assert memory_budget.EDITOR_CHAR_BUDGET == memory_budget.MEMORY_BUDGET_BYTES // 512
+    assert summary_pipeline.MAX_INPUT_LENGTH == memory_budget.EDITOR_CHAR_BUDGET
+    assert memory_budget.SAMPLE_BUDGET_BYTES < memory_budget.STREAM_FULL_LIMIT_BYTES < memory_budget.MEMORY_BUDGET_BYTES
+
+
+def test_over_budget_switches_small_text_files_to_streaming(tmp_path, monkeypatch):
+    path = tmp_path / "notes.txt"
+    path.write_text("short note", encoding="utf-8")
+    report = MemoryReport()
+    monkeypatch.setattr(summary_pipeline, "memory_report", report)
+    assert not summary_pipeline.is_large_text_file(str(path))
+
+    report.stages["extract"] = (memory_budget.MEMORY_BUDGET_BYTES + 1, 1)
+    assert report.over_budget() == ["extract"]
+    assert summary_pipeline.is_large_text_file(str(path))
+    assert not summary_pipeline.is_large_text_file(str(tmp_path / "slides.pptx"))
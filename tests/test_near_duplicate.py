@@ -0,0 +1,83 @@
+import random
+import sqlite3
+
+import near_duplicate
+from near_duplicate import DuplicateIndex, band_buckets, compute_signature, LSH_BANDS, NEAR_DUPLICATE_THRESHOLD
+
+WORDS = [f"word{i}" for i in range(2000)]
+
+
+def document(seed, length=400):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def edit(text, share, seed):
+    # Replaces a share of the words, keeping the rest in place
+    rng = random.Random(seed)
+    words = text.split()
+    for i in rng.sample(range(len(words)), int(len(words) * share)):
+        words[i] = rng.choice(WORDS)
+    return " ".join(words)
+
+
+def test_lsh_finds_near_duplicates_above_the_threshold(tmp_path):
+    index = DuplicateIndex(str(tmp_path / "summaries.db"))
+    originals = [document(seed) for seed in range(40)]
+    for number, text in enumerate(originals):
+        index.add("alice", f"doc {number}", text, f"summary {number}")
+
+    found = 0
+    for number, text in enumerate(originals):
+        match = index.find_near_duplicate("alice", edit(text, 0.02, seed=number), threshold=0.6)
+        found += match is not None and match["title"] == f"doc {number}"
+    assert found == len(originals) # Banding must not lose pairs well above the threshold
+    assert index.find_near_duplicate("alice", document(999)) is None
+
+
+def test_lookup_only_sees_the_users_own_documents(tmp_path):
+    index = DuplicateIndex(str(tmp_path / "summaries.db"))
+    text = document(1)
+    index.add("alice", "alice's", text, "summary")
+    assert index.find_near_duplicate("bob", text) is None
+    assert index.find_near_duplicate("alice", text)["similarity"] >= NEAR_DUPLICATE_THRESHOLD
+
+
+def test_index_from_an_older_version_is_rebuilt(tmp_path):
+    database = str(tmp_path / "summaries.db")
+    text = document(2)
+    signature = compute_signature(text)
+    document_id = DuplicateIndex(database).add("alice", "old", text, "summary", signature)
+    conn = sqlite3.connect(database)
+    conn.execute("DROP TABLE lsh_buckets")
+    conn.execute("CREATE TABLE lsh_buckets (band INTEGER NOT NULL, bucket INTEGER NOT NULL, document_id INTEGER NOT NULL)")
+    conn.executemany("INSERT INTO lsh_buckets VALUES (?, ?, ?)",
+                     [(band, bucket, document_id) for band, bucket in enumerate(band_buckets(signature))])
+    conn.execute("UPDATE documents SET signature = ?", (bytes(len(signature.tobytes())),)) # From the old permutations
+    conn.execute("PRAGMA user_version = 32")
+    conn.commit()
+    conn.close()
+
+    index = DuplicateIndex(database)
+    assert index.find_near_duplicate("alice", text)["id"] == document_id
+    conn = sqlite3.connect(database)
+    assert conn.execute("SELECT COUNT(*) FROM lsh_buckets WHERE username = 'alice'").fetchone()[0] == LSH_BANDS
+    assert conn.execute("SELECT signature FROM documents").fetchone()[0] == signature.tobytes()
+    conn.close()
+
+
+def test_candidate_lookup_does_not_bind_one_variable_per_candidate(tmp_path, monkeypatch):
+    # Every stored document shares a bucket with the probe; the query must still bind a fixed number of values
+    monkeypatch.setattr(near_duplicate, "LSH_BANDS", 1)
+    monkeypatch.setattr(near_duplicate, "LSH_ROWS", 1)
+    index = DuplicateIndex(str(tmp_path / "summaries.db"))
+    text = document(3)
+    signature = compute_signature(text)
+    conn = sqlite3.connect(index.database)
+    bucket = band_buckets(signature)[0]
+    conn.executemany("INSERT INTO lsh_buckets (username, band, bucket, document_id) VALUES ('alice', 0, ?, ?)",
+                     [(bucket, document_id) for document_id in range(1, 40000)])
+    conn.commit()
+    conn.close()
+    index.add("alice", "real", text, "summary", signature)
+    assert index.find_near_duplicate("alice", text, signature)["title"] == "real"
@@ -0,0 +1,164 @@
+import asyncio
+import json
+
+from fake_gemini import FakeGeminiModel
+from gemini_backend import ReplayModel
+from server import KeypointServer
+from summary_pipeline import TEXT_PROMPT
+
+
+def run_with_server(model, scenario, **server_options):
+    """Starts a KeypointServer on a free port, runs scenario(port) against it and stops it."""
+    async def run():
+        server = KeypointServer(lambda: model, **server_options)
+        port = (await server.start("127.0.0.1", 0))[1]
+        try:
+            return await scenario(port)
+        finally:
+            await server.stop()
+    return asyncio.run(run())
+
+
+async def send(port, method, path, body=b"", headers=None, content_length=None):
+    """Sends one request and returns (status, headers, body) once the server closes the connection."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    lines = [f"{method} {path} HTTP/1.1", "Host: localhost"]
+    for name, value in (headers or {}).items():
+        lines.append(f"{name}: {value}")
+    if method == "POST":
+        lines.append(f"Content-Length: {len(body) if content_length is None else content_length}")
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    response_headers = {}
+    for line in header_lines:
+        name, _, value = line.partition(":")
+        response_headers[name.strip().lower()] = value.strip()
+    if response_headers.get("transfer-encoding") == "chunked":
+        payload = decode_chunked(payload)
+    return int(status_line.split()[1]), response_headers, payload
+
+
+def decode_chunked(data):
+    pieces = []
+    while data:
+        size_line, _, data = data.partition(b"\r\n")
+        size = int(size_line, 16)
+        if size == 0:
+            break
+        pieces.append(data[:size])
+        data = data[size + 2:]
+    return b"".join(pieces)
+
+
+def summarize_body(**request):
+    return json.dumps(request).encode("utf-8")
+
+
+def test_summarize_returns_the_model_summary():
+    async def scenario(port):
+        return await send(port, "POST", "/summarize", summarize_body(text="alpha beta gamma"))
+
+    status, _, body = run_with_server(FakeGeminiModel(), scenario)
+    assert status == 200
+    assert "alpha beta gamma" in json.loads(body)["summary"]
+
+
+def test_summarize_streams_chunked_pieces():
+    model = FakeGeminiModel(stream_pieces=4)
+
+    async def scenario(port):
+        return await send(port, "POST", "/summarize?stream=1", summarize_body(text="one two three four five"))
+
+    status, headers, body = run_with_server(model, scenario)
+    assert status == 200
+    assert headers["transfer-encoding"] == "chunked"
+    expected = FakeGeminiModel().generate_content([TEXT_PROMPT, "one two three four five"]).text
+    assert body.decode("utf-8") == expected
+
+
+def test_streaming_backend_error_is_reported_in_the_body():
+    async def scenario(port):
+        return await send(port, "POST", "/summarize?stream=1", summarize_body(text="some text"))
+
+    status, _, body = run_with_server(ReplayModel(error_rate=1.0), scenario)
+    assert status == 200 # Headers go out before the model is called
+    assert b"[error] Summarization failed" in body
+
+
+def test_backend_error_returns_502():
+    async def scenario(port):
+        return await send(port, "POST", "/summarize", summarize_body(text="some text"))
+
+    status, _, body = run_with_server(ReplayModel(quota_error_rate=1.0), scenario)
+    assert status == 502
+    assert "429" in json.loads(body)["error"]
+
+
+def test_client_over_its_concurrency_limit_gets_429_before_the_body_is_read():
+    slow = ReplayModel(latency=0.5)
+
+    async def scenario(port):
+        headers = {"X-Client-Id": "tool-a"}
+        first = asyncio.ensure_future(send(port, "POST", "/summarize", summarize_body(text="slow one"), headers))
+        await asyncio.sleep(0.1) # Let the first request take the client's only slot
+        # Announces a 100 MB body but never sends it: the 429 must not wait for it
+        second = await asyncio.wait_for(
+            send(port, "POST", "/summarize", headers=headers, content_length=100 * 1024 * 1024), timeout=2)
+        other_client = await send(port, "POST", "/summarize", summarize_body(text="other"), {"X-Client-Id": "tool-b"})
+        return await first, second, other_client
+
+    first, second, other_client = run_with_server(slow, scenario, per_client_concurrency=1)
+    assert first[0] == 200
+    assert second[0] == 429
+    assert second[1]["retry-after"] == "1"
+    assert other_client[0] == 200
+
+
+def test_invalid_requests_return_400():
+    async def scenario(port):
+        return [
+            await send(port, "POST", "/summarize", summarize_body(text="x"), content_length="12abc"),
+            await send(port, "POST", "/summarize", b"[1, 2, 3]"),
+            await send(port, "POST", "/summarize", b"\xff\xfe"),
+            await send(port, "POST", "/summarize", summarize_body(text="x", max_output_tokens="many")),
+            await send(port, "POST", "/summarize", summarize_body(text="x", max_output_tokens=-5)),
+            await send(port, "POST", "/summarize", summarize_body(document_id=["a"])),
+            await send(port, "POST", "/summarize", summarize_body(text="   ")),
+            await send(port, "POST", "/summarize", summarize_body(text=None)),
+            await send(port, "POST", "/summarize", summarize_body(text=42)),
+            await send(port, "POST", "/summarize", b"{}"),
+        ]
+
+    for status, _, body in run_with_server(FakeGeminiModel(), scenario):
+        assert status == 400, body
+        assert json.loads(body)["error"]
+
+
+def test_unknown_document_and_endpoint():
+    async def scenario(port):
+        return (await send(port, "POST", "/summarize", summarize_body(document_id="missing")),
+                await send(port, "GET", "/nowhere"),
+                await send(port, "GET", "/summarize"))
+
+    unknown_document, unknown_endpoint, wrong_method = run_with_server(FakeGeminiModel(), scenario)
+    assert unknown_document[0] == 404
+    assert unknown_endpoint[0] == 404
+    assert wrong_method[0] == 405
+
+
+def test_upload_then_summarize_by_document_id():
+    async def scenario(port):
+        status, _, body = await send(port, "POST", "/documents?filename=notes.txt", b"Quarterly revenue grew strongly.")
+        assert status == 201
+        document_id = json.loads(body)["document_id"]
+        text = await send(port, "GET", f"/documents/{document_id}/text")
+        summary = await send(port, "POST", "/summarize", summarize_body(document_id=document_id))
+        return text, summary
+
+    text, summary = run_with_server(FakeGeminiModel(), scenario)
+    assert text[2].decode("utf-8").strip() == "Quarterly revenue grew strongly."
+    assert "revenue" in json.loads(summary[2])["summary"]
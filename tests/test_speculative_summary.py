@@ -0,0 +1,56 @@
+from fake_gemini import FakeGeminiModel
+from speculative_summary import SpeculativeSummarizer
+
+TEXT = "Quarterly report. Revenue grew while costs stayed flat."
+
+
+class EditingModel(FakeGeminiModel):
+    """Simulates the user editing the document while the (single) model call is in flight."""
+    def __init__(self, summarizer):
+        super().__init__()
+        self.summarizer = summarizer
+
+    def generate_content(self, contents, generation_config=None, stream=False):
+        self.summarizer.invalidate()
+        return super().generate_content(contents, generation_config, stream)
+
+
+def run_and_wait(summarizer, text):
+    thread = summarizer.start(text)
+    thread.join(5)
+    assert not thread.is_alive()
+
+
+def test_finished_run_is_cached_and_metered():
+    usage = []
+    summarizer = SpeculativeSummarizer(FakeGeminiModel, lambda *tokens: usage.append(tokens))
+    run_and_wait(summarizer, TEXT)
+    assert summarizer.cached(TEXT).startswith("- ")
+    assert len(usage) == 1 and usage[0][0] > 0
+
+
+def test_run_invalidated_before_the_model_call_sends_nothing():
+    usage = []
+    models = []
+    summarizer = None
+
+    def model_factory():
+        summarizer.invalidate() # An edit lands while the worker thread is starting
+        models.append(FakeGeminiModel())
+        return models[-1]
+
+    summarizer = SpeculativeSummarizer(model_factory, lambda *tokens: usage.append(tokens))
+    run_and_wait(summarizer, TEXT)
+    assert models[0].calls == 0
+    assert summarizer.cached(TEXT) is None
+    assert usage == []
+
+
+def test_result_of_a_run_invalidated_during_the_call_is_dropped():
+    usage = []
+    summarizer = SpeculativeSummarizer(None, lambda *tokens: usage.append(tokens))
+    summarizer.model_factory = lambda: EditingModel(summarizer)
+    run_and_wait(summarizer, TEXT)
+    assert summarizer.cached(TEXT) is None
+    assert not summarizer.is_running(TEXT)
+    assert len(usage) == 1 # The call was made, so its tokens still count
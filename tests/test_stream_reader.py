@@ -0,0 +1,64 @@
+import codecs
+
+from stream_reader import StreamedTextFile, detect_encoding, select_ranges
+
+
+def test_detect_encoding_from_bom_and_bytes():
+    assert detect_encoding(codecs.BOM_UTF8 + b"hello") == ("utf-8", 3)
+    assert detect_encoding(codecs.BOM_UTF16_LE + "hi".encode("utf-16-le")) == ("utf-16-le", 2)
+    assert detect_encoding("café".encode("utf-8")) == ("utf-8", 0)
+    assert detect_encoding("café au lait".encode("cp1252")) == ("cp1252", 0)
+    # A whole file ending in a cp1252 accent isn't mistaken for a truncated UTF-8 sequence
+    assert detect_encoding("café".encode("cp1252"), complete=True) == ("cp1252", 0)
+    # A multi-byte character cut off at the end of the sample is still UTF-8
+    assert detect_encoding("naïve".encode("utf-8")[:3]) == ("utf-8", 0)
+
+
+def read_all(path, **options):
+    with StreamedTextFile(str(path), **options) as stream:
+        return stream, "".join(stream.iter_chunks())
+
+
+def test_cp1252_file_is_decoded_in_line_aligned_pieces(tmp_path):
+    lines = [f"Résumé line {i} – naïve café" for i in range(200)]
+    path = tmp_path / "legacy.txt"
+    path.write_bytes("\n".join(lines).encode("cp1252"))
+
+    stream, text = read_all(path, chunk_bytes=256)
+    assert stream.encoding == "cp1252"
+    assert text == "\n".join(lines)
+    assert len(stream.ranges()) > 1
+    with StreamedTextFile(str(path), chunk_bytes=256) as stream:
+        assert all(piece.endswith("\n") for piece in list(stream.iter_chunks())[:-1])
+
+
+def test_utf8_bom_is_skipped(tmp_path):
+    path = tmp_path / "bom.txt"
+    path.write_bytes(codecs.BOM_UTF8 + "first\nsecond".encode("utf-8"))
+    _, text = read_all(path)
+    assert text == "first\nsecond"
+
+
+def test_rtf_splits_only_on_top_level_par(tmp_path):
+    paragraphs = [f"Paragraph number {i} with some words." for i in range(60)]
+    body = "".join(f"{{\\b Bold {i}}} {text}\\par\n" for i, text in enumerate(paragraphs))
+    path = tmp_path / "notes.rtf"
+    path.write_text("{\\rtf1\\ansi{\\fonttbl{\\f0 Arial;}}\n" + body + "}", encoding="ascii")
+
+    with StreamedTextFile(str(path), chunk_bytes=200) as stream:
+        assert len(stream.ranges()) > 1
+        for start, end in stream.ranges()[:-1]:
+            assert stream._mm[start:end].rstrip().endswith(b"\\par") # Every cut follows a \par
+        text = "".join(stream.iter_chunks())
+    for i, paragraph in enumerate(paragraphs):
+        assert f"Bold {i} {paragraph}" in text
+    assert "\\par" not in text and "{" not in text
+
+
+def test_select_ranges_modes():
+    ranges = [(i * 10, i * 10 + 10) for i in range(10)]
+    assert select_ranges(ranges, 1000) == ranges
+    assert select_ranges(ranges, 30, "head") == ranges[:3]
+    assert select_ranges(ranges, 30, "head_tail") == ranges[:2] + ranges[-1:]
+    stratified = select_ranges(ranges, 30, "stratified")
+    assert stratified[0] == ranges[0] and stratified[-1] == ranges[-1] and len(stratified) == 3
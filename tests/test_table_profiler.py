@@ -0,0 +1,58 @@
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from table_profiler import TableProfile, profile_csv, profile_xlsx
+
+
+def numeric_line(report, column):
+    return next(line for line in report.splitlines() if line.startswith(f"- {column} | ") and line.count("|") >= 5)
+
+
+def test_std_stays_accurate_for_large_offsets():
+    rng = np.random.default_rng(0)
+    values = 1.7e12 + rng.normal(0, 1000, 1_000_000)
+    profile = TableProfile("big")
+    for start in range(0, len(values), 200_000):
+        profile.add_chunk(pd.DataFrame({"v": values[start:start + 200_000]}))
+
+    count, mean, m2, low, high = profile.numeric["v"]
+    assert count == len(values)
+    assert abs(mean - values.mean()) < 1e-3
+    assert abs(np.sqrt(m2 / count) - values.std()) / values.std() < 1e-6
+
+
+def test_chunked_csv_matches_a_single_pass(tmp_path):
+    path = tmp_path / "sales.csv"
+    rng = np.random.default_rng(1)
+    frame = pd.DataFrame({"amount": rng.normal(50, 10, 1000), "region": rng.choice(["north", "south"], 1000)})
+    frame.to_csv(path, index=False)
+
+    chunked = profile_csv(str(path), chunk_size=97)
+    whole = profile_csv(str(path), chunk_size=10_000)
+    assert "Rows: 1000" in chunked
+    assert numeric_line(chunked, "amount") == numeric_line(whole, "amount")
+    assert "north (" in chunked and "south (" in chunked
+
+
+def test_mixed_column_accounts_for_every_row(tmp_path):
+    path = tmp_path / "mixed.csv"
+    path.write_text("v\n" + "\n".join(["1", "2", "3", "4", "5", "a", "b", "c", "d", "e"]) + "\n")
+    report = profile_csv(str(path), chunk_size=5)
+    assert "- v | 5 |" in report
+    assert "(+5 non-numeric values)" in report
+
+
+def test_xlsx_with_repeated_headers_is_profiled(tmp_path):
+    path = tmp_path / "book.xlsx"
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["Amount", "Amount", 1, 1.0])
+    for row in range(1, 8):
+        sheet.append([row, row * 2, row * 3, row * 4])
+    workbook.save(path)
+
+    report = profile_xlsx(str(path), chunk_size=3)
+    assert "Rows: 7  Columns: 4" in report
+    for column in ("Amount", "Amount.1", "1", "1.1"):
+        assert numeric_line(report, column)
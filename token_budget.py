@@ -0,0 +1,126 @@
+import math
+import time
+
+# Rough Gemini tokenizer ratios; close enough to plan requests without a network round trip
+CHARS_PER_TOKEN = 4.0 # Latin-script text
+TOKENS_PER_WORD = 1.3
+NON_ASCII_CHARS_PER_TOKEN = 1.5 # CJK and other scripts pack far fewer characters into a token
+IMAGE_TOKENS = 258 # Flat cost Gemini charges for one image
+
+SINGLE_SHOT_TOKEN_LIMIT = 250000 # Larger inputs are summarized chunk by chunk
+CHUNK_TOKEN_TARGET = 200000
+MIN_OUTPUT_TOKENS = 512
+MAX_OUTPUT_TOKENS = 8192
+CHUNK_MAX_OUTPUT_TOKENS = 2048 # Partial summaries are kept short; the combine step expands them
+OUTPUT_RATIO = 0.1 # Output budget as a share of the input
+
+DAILY_TOKEN_QUOTA = 1000000 # Per-user tokens per day before summaries need confirmation
+QUOTA_WARNING_RATIO = 0.8
+
+
+def estimate_tokens(text):
+    """Fast local token estimate for text; no tokenizer or network call."""
+    if not text:
+        return 0
+    by_words = len(text.split()) * TOKENS_PER_WORD
+    if text.isascii():
+        by_chars = len(text) / CHARS_PER_TOKEN
+    else:
+        # Every non-ASCII character adds at least one extra UTF-8 byte
+        non_ascii = min(len(text), len(text.encode("utf-8", "ignore")) - len(text))
+        by_chars = (len(text) - non_ascii) / CHARS_PER_TOKEN + non_ascii / NON_ASCII_CHARS_PER_TOKEN
+    return math.ceil(max(by_words, by_chars))
+
+
+def estimate_tokens_for_bytes(size):
+    """Estimate for a file we don't want to read, e.g. a large text file on disk."""
+    return math.ceil(size / CHARS_PER_TOKEN)
+
+
+class SummaryPlan:
+    """How a summary will be requested: one call or chunked, and the token budget for each call."""
+    __slots__ = ("mode", "input_tokens", "chunk_count", "chunk_chars", "chunk_output_tokens",
+                 "max_output_tokens", "estimated_tokens")
+
+    def __init__(self, mode, input_tokens, chunk_count, chunk_chars, chunk_output_tokens, max_output_tokens):
+        self.mode = mode # "single" or "chunked"
+        self.input_tokens = input_tokens
+        self.chunk_count = chunk_count
+        self.chunk_chars = chunk_chars
+        self.chunk_output_tokens = chunk_output_tokens
+        self.max_output_tokens = max_output_tokens
+        # Upper bound for the whole summary: every input token once, partial summaries
+        # read back in by the combine step, and all outputs at their budget
+        partial_tokens = chunk_count * chunk_output_tokens if mode == "chunked" else 0
+        self.estimated_tokens = input_tokens + 2 * partial_tokens + max_output_tokens
+
+    def __repr__(self):
+        return (f"SummaryPlan({self.mode!r}, input_tokens={self.input_tokens}, chunks={self.chunk_count}, "
+                f"max_output_tokens={self.max_output_tokens}, estimated_tokens={self.estimated_tokens})")
+
+
+def plan_summary(input_tokens, input_chars=None):
+    """
+    Chooses single-shot or chunked mode from an input token estimate and sizes the output budgets.
+    input_chars (when known) converts the token chunk size back into characters.
+    """
+    max_output_tokens = _clamp(input_tokens * OUTPUT_RATIO, MIN_OUTPUT_TOKENS, MAX_OUTPUT_TOKENS)
+    if input_chars is None:
+        input_chars = int(input_tokens * CHARS_PER_TOKEN)
+    if input_tokens <= SINGLE_SHOT_TOKEN_LIMIT:
+        return SummaryPlan("single", input_tokens, 1, input_chars, max_output_tokens, max_output_tokens)
+
+    chunk_count = math.ceil(input_tokens / CHUNK_TOKEN_TARGET)
+    chunk_chars = math.ceil(input_chars / chunk_count)
+    chunk_output_tokens = _clamp(CHUNK_TOKEN_TARGET * OUTPUT_RATIO, MIN_OUTPUT_TOKENS, CHUNK_MAX_OUTPUT_TOKENS)
+    return SummaryPlan("chunked", input_tokens, chunk_count, chunk_chars, chunk_output_tokens, max_output_tokens)
+
+
+def plan_text_summary(text):
+    return plan_summary(estimate_tokens(text), len(text))
+
+
+def _clamp(value, low, high):
+    return int(min(max(value, low), high))
+
+
+def start_of_today():
+    now = time.localtime()
+    return time.mktime((now.tm_year, now.tm_mon, now.tm_mday, 0, 0, 0, 0, 0, -1))
+
+
+class MeteredModel:
+    """
+    Wraps a model and adds up the tokens of every generate_content call, using the
+    response's usage_metadata when present and the local estimate otherwise.
+    """
+    def __init__(self, model):
+        self.model = model
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def generate_content(self, contents, generation_config=None, stream=False):
+        response = self.model.generate_content(contents, generation_config=generation_config, stream=stream)
+        if stream:
+            return self._metered_stream(contents, response)
+        self._record(contents, response, response.text if response.text else "")
+        return response
+
+    def _metered_stream(self, contents, response):
+        pieces = []
+        for chunk in response:
+            if chunk.text:
+                pieces.append(chunk.text)
+            yield chunk
+        self._record(contents, response, "".join(pieces))
+
+    def _record(self, contents, response, output_text):
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = getattr(usage, "prompt_token_count", 0) if usage else 0
+        output_tokens = getattr(usage, "candidates_token_count", 0) if usage else 0
+        if not prompt_tokens:
+            prompt_tokens = sum(estimate_tokens(part) if isinstance(part, str) else IMAGE_TOKENS for part in contents)
+        if not output_tokens:
+            output_tokens = estimate_tokens(output_text)
+        self.input_tokens += prompt_tokens
+        self.output_tokens += output_tokens